@@ -0,0 +1,121 @@
+"""
+Version counters for caches invalidated by content changes.
+
+A cache key embeds the current version of whatever its content depends on
+(e.g. ``"navigation"``). Bumping the version makes every older entry
+unreachable at once, and those entries then expire on their own; this is
+simpler than tracking and deleting individual keys.
+
+Counters live in the ``default`` cache, which is shared by all processes in
+production, so a bump in one worker is seen by all of them.
+"""
+
+import time
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f"cache-version:{name}"
+
+
+def _initial_version():
+    # Seeded from the clock rather than 1, so a counter evicted from the cache
+    # never comes back at a value whose old entries may still be around.
+    return int(time.time() * 1000)
+
+
+def get_cache_versions(*names):
+    """Return ``{name: version}`` for the given counters in one cache round trip."""
+    keys = {_version_key(name): name for name in names}
+    versions = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    for name in names:
+        if name not in versions:
+            cache.add(_version_key(name), _initial_version(), None)
+            versions[name] = cache.get(_version_key(name))
+    return versions
+
+
+def get_cache_version(name):
+    return get_cache_versions(name)[name]
+
+
+def bump_cache_version(*names):
+    """Invalidate every cache entry keyed on the given counters."""
+    request_versions = _request_versions.get()
+    for name in names:
+        if request_versions is not None:
+            request_versions.pop(name, None)
+        try:
+            cache.incr(_version_key(name))
+        except ValueError:
+            cache.add(_version_key(name), _initial_version(), None)
+
+
+# Upper bound on how long a process keeps a value without rebuilding it, in
+# case a version bump is lost (e.g. the shared cache was flushed or evicted
+# the counter).
+LOCAL_CACHE_TIMEOUT = 60
+
+# name -> (versions, value, expires); one copy per process.
+_local_cache = {}
+
+# Every counter local_cached has been asked for in this process, so that the
+# first call in a request can read them all in one round trip.
+_local_version_names = set()
+
+# name -> version, for the counters read during the current request; None
+# outside a request (see CacheVersionsMiddleware).
+_request_versions = ContextVar("request_cache_versions", default=None)
+
+
+def _get_request_versions(names):
+    request_versions = _request_versions.get()
+    if request_versions is None:
+        return get_cache_versions(*names)
+    if any(name not in request_versions for name in names):
+        missing = (_local_version_names | set(names)) - request_versions.keys()
+        request_versions.update(get_cache_versions(*missing))
+    return {name: request_versions[name] for name in names}
+
+
+def local_cached(name, build, *version_names):
+    """
+    Return ``build()``, kept in process memory until a version counter moves.
+
+    For small values needed on every request (e.g. the header): the counters
+    are read from the shared cache once per request, in one round trip for
+    every ``local_cached`` value, so a hit costs no database queries. Bumping
+    any of ``version_names`` (default: ``name``) from any worker makes every
+    process rebuild on its next request. Values are also rebuilt after
+    ``LOCAL_CACHE_TIMEOUT`` seconds regardless.
+    """
+    version_names = version_names or (name,)
+    _local_version_names.update(version_names)
+    versions = _get_request_versions(version_names)
+    now = time.monotonic()
+    entry = _local_cache.get(name)
+    if entry is None or entry[0] != versions or entry[2] <= now:
+        entry = (versions, build(), now + LOCAL_CACHE_TIMEOUT)
+        _local_cache[name] = entry
+    return entry[1]
+
+
+class CacheVersionsMiddleware:
+    """
+    Keep the counters ``local_cached`` reads for the length of a request.
+
+    Outside a request (e.g. in tasks and management commands) every call
+    reads the counters again.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_versions.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _request_versions.reset(token)
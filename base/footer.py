@@ -0,0 +1,75 @@
+"""
+The rendered site footer, cached per site.
+
+The footer is identical on every page of a site, so its HTML is cached under
+the site and two version counters (see ``base.cache``): ``"footer"``, bumped
+when FooterSettings are saved or deleted, and ``"navigation"``, bumped when
+pages (and so the linked page URLs) are published, unpublished, moved or
+deleted.
+"""
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from base.cache import get_cache_versions
+from base.models import FooterSettings
+from base.navigation import NAVIGATION_CACHE_VERSION
+
+FOOTER_CACHE_VERSION = "footer"
+FOOTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_footer_page_ids():
+    """IDs of the pages linked from any site's footer, read from the raw JSON."""
+    page_ids = set()
+    for settings in FooterSettings.objects.all():
+        for column in settings.footer_links.raw_data:
+            for link in column["value"].get("links", []):
+                # ListBlock items are stored either bare or as {"type": "item", ...}.
+                link = link.get("value", link)
+                if link.get("link_page"):
+                    page_ids.add(link["link_page"])
+    return page_ids
+
+
+def _render_footer(request, site):
+    settings = FooterSettings.for_site(site)
+    # Iterating the StreamField converts all columns at once, so every
+    # PageChooserBlock target is fetched in a single in_bulk() query.
+    columns = [
+        {
+            "title": column.value["title"],
+            "links": [
+                {"text": link["link_text"], "url": link["link_page"].get_url(request)}
+                for link in column.value["links"]
+                if link["link_page"] is not None
+            ],
+        }
+        for column in settings.footer_links
+    ]
+    return render_to_string(
+        "includes/footer.html",
+        {
+            "settings": settings,
+            "social_links": list(settings.social_links.all()),
+            "columns": columns,
+            "current_site": site,
+            "request": request,
+        },
+    )
+
+
+def render_footer(request, site):
+    """The footer HTML for ``site``, from the cache unless previewing."""
+    if getattr(request, "is_preview", False):
+        return mark_safe(_render_footer(request, site))
+    versions = get_cache_versions(FOOTER_CACHE_VERSION, NAVIGATION_CACHE_VERSION)
+    key = "footer:{}:{}:{}".format(
+        versions[FOOTER_CACHE_VERSION], versions[NAVIGATION_CACHE_VERSION], site.pk
+    )
+    html = cache.get(key)
+    if html is None:
+        html = _render_footer(request, site)
+        cache.set(key, html, FOOTER_CACHE_TIMEOUT)
+    return mark_safe(html)
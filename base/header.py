@@ -0,0 +1,55 @@
+"""
+The live Header snippet as the site header renders it.
+
+The header is on every page but changes rarely, so its resolved form is kept
+per process (see ``base.cache.local_cached``) and invalidated through the
+``"header"`` version counter, which ``base.signals`` bumps when the snippet is
+published, unpublished, saved or deleted. The CTA URL also depends on the
+page tree, so the ``"navigation"`` counter invalidates it as well.
+"""
+
+from dataclasses import dataclass
+
+from base.cache import local_cached
+from base.models import Header
+from base.navigation import NAVIGATION_CACHE_VERSION
+
+HEADER_CACHE_VERSION = "header"
+
+
+@dataclass(frozen=True)
+class ResolvedHeader:
+    site_title: str
+    logo_alt: str
+    cta_text: str
+    cta_link: str
+
+    def __str__(self):
+        return self.site_title or (self.logo_alt or "Header snippet")
+
+
+def _resolve_header():
+    header = (
+        Header.objects.filter(live=True)
+        .select_related("cta_page")
+        .order_by("pk")
+        .first()
+    )
+    if header is None:
+        return None
+    return ResolvedHeader(
+        site_title=header.site_title,
+        logo_alt=header.logo_alt,
+        cta_text=header.cta_text,
+        cta_link=header.cta_link,
+    )
+
+
+def get_live_header():
+    """The first live Header snippet, resolved for rendering, or None."""
+    return local_cached(
+        HEADER_CACHE_VERSION,
+        _resolve_header,
+        HEADER_CACHE_VERSION,
+        NAVIGATION_CACHE_VERSION,
+    )
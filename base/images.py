@@ -0,0 +1,281 @@
+"""
+Bulk rendition helpers for templates that render many images at once.
+
+Wagtail's ``{% image %}`` tag resolves one rendition per call. Grids and
+galleries that render a dozen images would otherwise look each one up (and
+possibly generate it) separately; ``batch_renditions`` resolves them together.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.dispatch import Signal
+from wagtail.images.models import AbstractImage, Filter, SourceImageIOError
+
+# Sent with `page` once its renditions have been generated, so read models that
+# embed renditions (e.g. product cards) can pick them up.
+renditions_warmed = Signal()
+
+IMAGE_MIME_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+@dataclass(frozen=True)
+class RenditionPolicy:
+    """
+    How one image slot is rendered responsively.
+
+    The slot is ``operation-WIDTHxHEIGHT`` (``fill`` crops, ``max`` only bounds
+    the size) rendered at each of ``widths`` in each of ``formats``. The last
+    format is the fallback used for ``<img src/srcset>``; the ones before it
+    become ``<source type=...>`` entries of a ``<picture>``.
+
+    Page types declare their policies as class attributes and add
+    ``policy.filter_specs`` to their ``rendition_specs`` so every variant is
+    pre-generated on publish.
+    """
+
+    operation: str
+    width: int
+    height: int
+    widths: tuple = ()
+    formats: tuple = ("avif", "webp", "jpeg")
+    sizes: str = "100vw"
+
+    def spec(self, width, format):
+        height = round(self.height * width / self.width)
+        return f"{self.operation}-{width}x{height}|format-{format}"
+
+    @property
+    def filter_specs(self):
+        widths = self.widths or (self.width,)
+        return tuple(
+            self.spec(width, format) for format in self.formats for width in widths
+        )
+
+    def srcset(self, renditions, format):
+        """``srcset`` for one format from ``{filter_spec: rendition}``."""
+        candidates = {}
+        for width in self.widths or (self.width,):
+            rendition = renditions.get(self.spec(width, format))
+            if rendition is not None:
+                # `max` never upscales, so small sources repeat a width.
+                candidates.setdefault(rendition.width, rendition.url)
+        return ", ".join(f"{url} {width}w" for width, url in sorted(candidates.items()))
+
+    def picture(self, renditions):
+        """
+        Describe the rendered slot for a template, or None without renditions.
+
+        Returns a plain dict (so it can be stored on read models) with ``src``,
+        ``srcset``, ``width`` and ``height`` of the largest fallback rendition,
+        the policy's ``sizes`` and the modern-format ``sources``.
+        """
+        *modern, fallback = self.formats
+        largest = None
+        for width in sorted(self.widths or (self.width,), reverse=True):
+            largest = renditions.get(self.spec(width, fallback))
+            if largest is not None:
+                break
+        if largest is None:
+            return None
+        return {
+            "src": largest.url,
+            "srcset": self.srcset(renditions, fallback),
+            "width": largest.width,
+            "height": largest.height,
+            "sizes": self.sizes,
+            "sources": [
+                {"type": IMAGE_MIME_TYPES[format], "srcset": self.srcset(renditions, format)}
+                for format in modern
+                if self.srcset(renditions, format)
+            ],
+        }
+
+
+def _as_image(item):
+    """
+    Accept an image, or an object holding one (e.g. a gallery row) on
+    ``.display_image`` or ``.image``.
+    """
+    if isinstance(item, AbstractImage):
+        return item
+    if hasattr(item, "display_image"):
+        return item.display_image
+    return getattr(item, "image", None)
+
+
+def _remember_renditions(image, renditions):
+    """Store renditions where `Image.find_existing_renditions` will look first."""
+    prefetched = image._get_prefetched_renditions()
+    if prefetched is None:
+        image.prefetched_renditions = list(renditions)
+    else:
+        for rendition in renditions:
+            image._add_to_prefetched_renditions(rendition)
+
+
+def batch_renditions(items, *filter_specs):
+    """
+    Fetch or create renditions for every image in ``items`` in bulk.
+
+    Renditions are read from the renditions cache first, then with one query
+    per filter spec for the rest; any that are still missing are generated per
+    image. Every rendition is attached to its image
+    instances and written to the renditions cache, so later ``{% image %}`` calls
+    on the same objects cost no queries.
+
+    Returns ``{image_pk: {filter_spec: rendition}}``.
+    """
+    images = defaultdict(list)
+    for item in items:
+        image = _as_image(item)
+        if image is not None and image.pk is not None:
+            images[image.pk].append(image)
+    filter_specs = list(dict.fromkeys(filter_specs))
+    if not images or not filter_specs:
+        return {}
+
+    Rendition = next(iter(images.values()))[0].get_rendition_model()
+    found = defaultdict(dict)
+
+    # SVGs rewrite their filter specs per image, so leave them to Wagtail.
+    svg_pks = {pk for pk, instances in images.items() if instances[0].is_svg()}
+    for pk in svg_pks:
+        found[pk] = images[pk][0].get_renditions(*filter_specs)
+
+    raster_pks = [pk for pk in images if pk not in svg_pks]
+    cache_keys = {}
+    for pk in raster_pks:
+        image = images[pk][0]
+        for spec in filter_specs:
+            key = Rendition.construct_cache_key(
+                image, Filter(spec=spec).get_cache_key(image), spec
+            )
+            cache_keys[key] = (pk, spec)
+    for key, rendition in Rendition.cache_backend.get_many(cache_keys).items():
+        pk, spec = cache_keys.pop(key)
+        rendition.image = images[pk][0]
+        found[pk][spec] = rendition
+
+    # Whatever the cache did not have: one query per filter spec.
+    for spec in filter_specs:
+        pks = [pk for pk, missing_spec in cache_keys.values() if missing_spec == spec]
+        if not pks:
+            continue
+        filter = Filter(spec=spec)
+        for rendition in Rendition.objects.filter(image_id__in=pks, filter_spec=spec):
+            image = images[rendition.image_id][0]
+            if rendition.focal_point_key == filter.get_cache_key(image):
+                rendition.image = image
+                found[rendition.image_id][spec] = rendition
+
+    cache_additions = {}
+    for key, (pk, spec) in cache_keys.items():
+        if spec in found[pk]:
+            cache_additions[key] = found[pk][spec]
+    for pk in raster_pks:
+        image = images[pk][0]
+        missing = [Filter(spec=spec) for spec in filter_specs if spec not in found[pk]]
+        if not missing:
+            continue
+        try:
+            created = image.create_renditions(*missing)
+        except SourceImageIOError:
+            continue
+        for filter, rendition in created.items():
+            found[pk][filter.spec] = rendition
+            key = Rendition.construct_cache_key(
+                image, filter.get_cache_key(image), filter.spec
+            )
+            cache_additions[key] = rendition
+
+    for pk, instances in images.items():
+        for image in instances:
+            _remember_renditions(image, found[pk].values())
+
+    if cache_additions:
+        Rendition.cache_backend.set_many(cache_additions)
+    return {pk: dict(renditions) for pk, renditions in found.items()}
+
+
+def get_picture(image, policy, create=True):
+    """
+    Render ``image`` under a RenditionPolicy; see `RenditionPolicy.picture`.
+
+    Renditions already resolved by `batch_renditions` are reused. With
+    ``create=False`` only renditions that already exist are used, so nothing
+    is generated (and the picture may be None or lack some variants).
+    """
+    if image is None:
+        return None
+    filters = {
+        spec: image.clean_filter_for_svg(Filter(spec=spec))
+        for spec in policy.filter_specs
+    }
+    if create:
+        try:
+            renditions = image.get_renditions(*(f.spec for f in filters.values()))
+        except SourceImageIOError:
+            return None
+    else:
+        renditions = {
+            filter.spec: rendition
+            for filter, rendition in image.find_existing_renditions(
+                *filters.values()
+            ).items()
+        }
+    return policy.picture(
+        {
+            spec: renditions[filter.spec]
+            for spec, filter in filters.items()
+            if filter.spec in renditions
+        }
+    )
+
+
+def get_source_images(obj, source):
+    """
+    Resolve a ``rendition_specs`` source on ``obj`` to a list of images.
+
+    ``source`` is an attribute path such as ``"hero_image"``,
+    ``"gallery_images"`` (a relation of rows with an ``image``) or
+    ``"testimonial.author_image"``.
+    """
+    value = obj
+    for name in source.split("."):
+        value = getattr(value, name, None)
+        if value is None:
+            return []
+    if hasattr(value, "all"):
+        value = value.all()
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return [image for image in map(_as_image, value) if image is not None]
+
+
+def warm_page_renditions(page):
+    """
+    Generate every rendition listed in ``page.rendition_specs`` ahead of time.
+
+    Page types declare ``rendition_specs = {source: (filter_spec, ...)}`` for
+    the images their templates render, so the first visitor after a publish
+    does not pay for generating them. Returns the number of renditions resolved.
+    """
+    count = 0
+    for source, filter_specs in getattr(page, "rendition_specs", {}).items():
+        resolved = batch_renditions(get_source_images(page, source), *filter_specs)
+        count += sum(len(renditions) for renditions in resolved.values())
+    renditions_warmed.send(sender=type(page), page=page)
+    return count
+
+
+def get_rendition_page_models():
+    """Page types that declare ``rendition_specs``."""
+    from wagtail.models import get_page_models
+
+    return [model for model in get_page_models() if getattr(model, "rendition_specs", None)]
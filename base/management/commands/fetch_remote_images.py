@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from wagtail.models import Page
+
+from base.models import RemoteImage
+from base.remote_images import (
+    fetch_remote_image,
+    get_remote_image_page_models,
+    queue_remote_images,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the linked images of every live page that declares "
+        "get_remote_image_urls and download the ones without a local copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also retry URLs whose previous download failed.",
+        )
+
+    def handle(self, *args, **options):
+        urls = []
+        models = get_remote_image_page_models()
+        if models:
+            pages = Page.objects.live().type(*models).specific()
+            for page in pages.iterator():
+                urls.extend(page.get_remote_image_urls())
+        queue_remote_images(urls)
+
+        statuses = [RemoteImage.Status.PENDING]
+        if options["retry_failed"]:
+            statuses.append(RemoteImage.Status.FAILED)
+        fetched = failed = 0
+        for remote in RemoteImage.objects.filter(status__in=statuses).iterator():
+            if fetch_remote_image(remote) is None:
+                failed += 1
+                self.stderr.write(f"{remote.url}: {remote.error}")
+            else:
+                fetched += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Fetched {fetched} remote images, {failed} failed.")
+        )
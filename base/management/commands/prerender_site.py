@@ -0,0 +1,94 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtail.models import Site
+
+from base.prerender import (
+    get_site_pages,
+    get_stale_pages,
+    read_manifest,
+    remove_pages,
+    render_pages,
+    render_site_files,
+    write_manifest,
+)
+from base.processes import init_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every live page, the sitemap and the 404 page of each site to "
+        "static files, re-rendering only pages changed since the last run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.PRERENDER_ROOT,
+            help="Directory to write to; each site gets a directory named "
+            "after its hostname (defaults to PRERENDER_ROOT).",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Number of worker processes (defaults to the number of CPUs).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Number of pages handed to a worker at a time.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-render every page, not just the pages that changed.",
+        )
+
+    def handle(self, *args, **options):
+        output = os.path.abspath(options["output"])
+        batch_size = options["batch_size"]
+
+        for site in Site.objects.order_by("hostname", "port"):
+            site_root = os.path.join(output, site.hostname)
+            manifest = {} if options["full"] else read_manifest(output, site)
+            pages = get_site_pages(site)
+            stale = get_stale_pages(site_root, pages, manifest)
+            removed = [url_path for url_path in manifest if url_path not in pages]
+            remove_pages(site_root, removed)
+
+            items = list(stale.items())
+            batches = [
+                items[start : start + batch_size]
+                for start in range(0, len(items), batch_size)
+            ]
+            manifest = {
+                url_path: entry
+                for url_path, entry in manifest.items()
+                if url_path in pages and url_path not in stale
+            }
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options["processes"], initializer=init_worker
+            ) as executor:
+                futures = [
+                    executor.submit(render_pages, site.pk, site_root, batch)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    manifest.update(future.result())
+            render_site_files(site, site_root)
+            write_manifest(output, site, manifest)
+
+            dynamic = sum(1 for _, written in manifest.values() if not written)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{site.hostname}: rendered {len(stale)} of {len(pages)} pages "
+                    f"({dynamic} left to Django), removed {len(removed)}."
+                )
+            )
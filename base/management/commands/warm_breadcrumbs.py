@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from base.navigation import warm_breadcrumbs
+
+
+class Command(BaseCommand):
+    help = "Cache the breadcrumbs of every live page for the current page tree."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of cache entries written at a time.",
+        )
+
+    def handle(self, *args, **options):
+        count = warm_breadcrumbs(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Cached breadcrumbs for {count} pages."))
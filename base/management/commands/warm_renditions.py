@@ -0,0 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtail.models import Page
+
+from base.images import get_rendition_page_models, warm_page_renditions
+from base.processes import init_worker
+
+
+def _warm_pages(page_ids):
+    count = 0
+    for page in Page.objects.filter(pk__in=page_ids).specific():
+        count += warm_page_renditions(page)
+    return count
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-generate the renditions listed in each page type's rendition_specs "
+        "for every live page, spread across worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Number of worker processes (defaults to the number of CPUs).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Number of pages handed to a worker at a time.",
+        )
+
+    def handle(self, *args, **options):
+        models = get_rendition_page_models()
+        if not models:
+            self.stdout.write("No page types declare rendition_specs.")
+            return
+
+        page_ids = list(
+            Page.objects.live()
+            .type(*models)
+            .order_by("path")
+            .values_list("pk", flat=True)
+        )
+        batch_size = options["batch_size"]
+        batches = [
+            page_ids[start : start + batch_size]
+            for start in range(0, len(page_ids), batch_size)
+        ]
+
+        connections.close_all()
+        count = 0
+        with ProcessPoolExecutor(
+            max_workers=options["processes"], initializer=init_worker
+        ) as executor:
+            futures = [executor.submit(_warm_pages, batch) for batch in batches]
+            for future in as_completed(futures):
+                count += future.result()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warmed {count} renditions across {len(page_ids)} pages."
+            )
+        )
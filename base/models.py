@@ -285,3 +285,39 @@ class SocialLink(Orderable):
         FieldPanel("url"),
         FieldPanel("icon_class"),
     ]
+
+
+class RemoteImage(models.Model):
+    """
+    A local copy of an image that editors linked by URL rather than uploaded.
+
+    Rows are created as pending when a page linking the URL is published (see
+    `base.signals`), never while rendering, and filled in by
+    `base.tasks.fetch_remote_image_task`, after which templates serve
+    renditions of `image` instead of hot-linking the URL. See
+    `base.remote_images`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        FETCHED = "fetched", "Fetched"
+        FAILED = "failed", "Failed"
+
+    url = models.URLField(max_length=500, unique=True)
+    image = models.ForeignKey(
+        "wagtailimages.Image",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.url
@@ -0,0 +1,165 @@
+"""
+Cached navigation derived from the page tree: the header menu and breadcrumbs.
+
+``get_menu_tree`` loads every live, in-menu page below a site root with a
+single treebeard ``path`` prefix query and caches the resulting tree.
+``get_breadcrumbs`` caches the ancestors of a page by its ``path``. Both are
+keyed on the ``"navigation"`` version counter (see ``base.cache``), which
+``base.signals`` bumps whenever pages are published, unpublished, moved or
+deleted.
+"""
+
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from wagtail.models import Page
+
+from base.cache import get_cache_version
+
+NAVIGATION_CACHE_VERSION = "navigation"
+NAVIGATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Levels below the site root: the menu, its dropdowns, and whether a
+# dropdown item has children of its own.
+MENU_DEPTH = 3
+
+
+@dataclass
+class MenuItem:
+    pk: int
+    title: str
+    slug: str
+    url: str
+    url_path: str
+    children: list = field(default_factory=list)
+    active: bool = False
+
+    @property
+    def has_dropdown(self):
+        return bool(self.children)
+
+    def __str__(self):
+        return self.title
+
+
+@dataclass
+class Breadcrumb:
+    title: str
+    url: str
+
+    def __str__(self):
+        return self.title
+
+
+def _get_url(page):
+    """The page's URL relative to its site root, or None if not routable."""
+    url_parts = page.get_url_parts()
+    if url_parts is None:
+        return None
+    return url_parts[2]
+
+
+def _build_menu_tree(root):
+    pages = (
+        Page.objects.live()
+        .in_menu()
+        .filter(
+            path__startswith=root.path,
+            depth__gt=root.depth,
+            depth__lte=root.depth + MENU_DEPTH,
+        )
+        .order_by("path")
+    )
+    children = {root.path: []}
+    for page in pages:
+        siblings = children.get(page.path[: -Page.steplen])
+        url = _get_url(page)
+        if siblings is None or url is None:
+            # Below a page that is not in the menu, or not routable.
+            continue
+        item = MenuItem(
+            pk=page.pk,
+            title=page.title,
+            slug=page.slug,
+            url=url,
+            url_path=page.url_path,
+        )
+        siblings.append(item)
+        children[page.path] = item.children
+    return children[root.path]
+
+
+def get_menu_tree(root):
+    """The live, in-menu pages below ``root`` as nested ``MenuItem``s."""
+    key = "navigation:{}:{}".format(
+        get_cache_version(NAVIGATION_CACHE_VERSION), root.pk
+    )
+    tree = cache.get(key)
+    if tree is None:
+        tree = _build_menu_tree(root)
+        cache.set(key, tree, NAVIGATION_CACHE_TIMEOUT)
+    return tree
+
+
+def mark_active(menuitems, calling_page):
+    """Flag the items on the path to ``calling_page``."""
+    for menuitem in menuitems:
+        # We don't directly check if calling_page is None since the template
+        # engine can pass an empty string to calling_page
+        # if the variable passed as calling_page does not exist.
+        menuitem.active = (
+            calling_page.url_path.startswith(menuitem.url_path)
+            if calling_page
+            else False
+        )
+    return menuitems
+
+
+def _breadcrumbs_key(version, path):
+    return f"breadcrumbs:{version}:{path}"
+
+
+def _ancestor_paths(path):
+    """Paths of a page and its ancestors below the tree root, top down."""
+    return [
+        path[:end] for end in range(2 * Page.steplen, len(path) + 1, Page.steplen)
+    ]
+
+
+def get_breadcrumbs(page):
+    """
+    ``Breadcrumb``s for ``page`` and its ancestors, excluding the tree root.
+
+    Ancestors follow from the page's materialized ``path``, so a miss costs
+    one query and a hit none.
+    """
+    key = _breadcrumbs_key(get_cache_version(NAVIGATION_CACHE_VERSION), page.path)
+    crumbs = cache.get(key)
+    if crumbs is None:
+        ancestors = Page.objects.filter(path__in=_ancestor_paths(page.path))
+        crumbs = [
+            Breadcrumb(title=ancestor.title, url=_get_url(ancestor))
+            for ancestor in ancestors.order_by("path")
+        ]
+        cache.set(key, crumbs, NAVIGATION_CACHE_TIMEOUT)
+    return crumbs
+
+
+def warm_breadcrumbs(batch_size=500):
+    """Cache the breadcrumbs of every live page; returns the number cached."""
+    version = get_cache_version(NAVIGATION_CACHE_VERSION)
+    pages = Page.objects.filter(depth__gt=1).order_by("path")
+    crumbs = {}
+    batch = {}
+    count = 0
+    for page in pages.only("path", "title", "url_path", "live").iterator():
+        crumb = Breadcrumb(title=page.title, url=_get_url(page))
+        crumbs[page.path] = crumbs.get(page.path[: -Page.steplen], []) + [crumb]
+        if page.live:
+            batch[_breadcrumbs_key(version, page.path)] = crumbs[page.path]
+        if len(batch) >= batch_size:
+            cache.set_many(batch, NAVIGATION_CACHE_TIMEOUT)
+            count += len(batch)
+            batch = {}
+    cache.set_many(batch, NAVIGATION_CACHE_TIMEOUT)
+    return count + len(batch)
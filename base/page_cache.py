@@ -0,0 +1,252 @@
+"""
+Full-page cache for anonymous visitors.
+
+``PageCacheMiddleware`` serves and stores the responses of Wagtail pages,
+keyed by site, path and query string. Only plain anonymous GETs are
+involved: requests carrying a session or messages cookie, responses that set
+cookies, used a CSRF token (i.e. contain a form), touched the session or vary
+on request headers other than ``Cookie``, and previews are never cached.
+
+Each entry records the page that produced it. Purging works through version
+counters (see ``base.cache``) rather than deleting keys: one per page,
+bumped by ``purge_for_page`` on publish/unpublish for the page and every
+page that renders it, and a global one bumped by ``purge_all`` when
+site-wide inputs (settings, snippets, sites, the menu) change.
+
+The same counters, with the page's latest revision, make up the ``ETag`` of
+page responses, so a revalidating client gets a 304 from the
+``before_serve_page`` hook before the page is rendered (see
+``get_not_modified_response``). No ``Last-Modified`` is sent:
+``last_published_at`` misses changes to embedded content, such as the cards
+on a listing page, and would let browsers cache pages heuristically.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from wagtail.models import Page, ReferenceIndex
+
+from base.cache import bump_cache_version, get_cache_versions
+from base.footer import FOOTER_CACHE_VERSION, get_footer_page_ids
+from base.header import HEADER_CACHE_VERSION
+from base.navigation import NAVIGATION_CACHE_VERSION
+from base.sites import get_site_for_request
+
+PAGE_CACHE_VERSION = "page-cache"
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60)
+
+# Response headers worth replaying from the cache.
+CACHED_HEADERS = (
+    "Content-Type",
+    "Content-Language",
+    "X-Frame-Options",
+    "Cross-Origin-Opener-Policy",
+    "Referrer-Policy",
+    "X-Content-Type-Options",
+    "Content-Security-Policy",
+    "Content-Security-Policy-Report-Only",
+    "ETag",
+    "Vary",
+)
+
+# Site-wide inputs of every page, on top of the page cache counters.
+ETAG_CACHE_VERSIONS = (
+    HEADER_CACHE_VERSION,
+    FOOTER_CACHE_VERSION,
+    NAVIGATION_CACHE_VERSION,
+)
+
+
+def _page_version_name(page_id):
+    return f"{PAGE_CACHE_VERSION}:{page_id}"
+
+
+def _cache_key(request, site):
+    digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f"page-cache:{site.pk}:{digest}"
+
+
+def _versions(page_id):
+    versions = get_cache_versions(PAGE_CACHE_VERSION, _page_version_name(page_id))
+    return (versions[PAGE_CACHE_VERSION], versions[_page_version_name(page_id)])
+
+
+def mark_cacheable(request, page):
+    """Called for every served page (see base.wagtail_hooks)."""
+    request.page_cache_page_id = page.pk
+    # Read before rendering, so a purge during the render leaves the entry
+    # already stale rather than storing outdated content as current.
+    request.page_cache_versions = _versions(page.pk)
+
+
+def _is_anonymous(request):
+    # Pending messages are rendered into the page once, so a visitor who has
+    # some must get a fresh page.
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def get_page_version(page, *version_names):
+    """
+    A hash that changes whenever the rendered output of ``page`` may have.
+
+    It combines the page's revision with its page cache counters, which every
+    change the page renders purges, and optionally further counters.
+    """
+    names = (PAGE_CACHE_VERSION, _page_version_name(page.pk), *version_names)
+    versions = get_cache_versions(*names)
+    validator = ":".join(
+        str(value)
+        for value in (
+            page.pk,
+            page.latest_revision_id,
+            page.last_published_at and page.last_published_at.timestamp(),
+            *(versions[name] for name in names),
+        )
+    )
+    return hashlib.sha1(validator.encode()).hexdigest()
+
+
+def get_page_etag(page):
+    return quote_etag(get_page_version(page, *ETAG_CACHE_VERSIONS))
+
+
+def get_not_modified_response(request, page):
+    """
+    A 304 response if the client's copy of ``page`` is current, else None.
+
+    Only anonymous GET and HEAD requests are validated; the ETag is kept on
+    the request for ``PageCacheMiddleware`` to send with the full response.
+    """
+    if (
+        request.method not in ("GET", "HEAD")
+        or not _is_anonymous(request)
+        or getattr(request, "is_preview", False)
+    ):
+        return None
+    request.page_etag = get_page_etag(page)
+    response = get_conditional_response(request, etag=request.page_etag)
+    if response is not None:
+        response["ETag"] = request.page_etag
+    return response
+
+
+def _varies_only_on_cookie(response):
+    # Entries are keyed on the URL alone; the cookies that matter keep a
+    # request away from the cache altogether.
+    vary = {
+        header.strip().lower()
+        for header in response.get("Vary", "").split(",")
+        if header.strip()
+    }
+    return vary <= {"cookie"}
+
+
+def _is_cacheable(request, response):
+    session = getattr(request, "session", None)
+    return (
+        request.method == "GET"
+        and getattr(request, "page_cache_page_id", None) is not None
+        and not getattr(request, "is_preview", False)
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header("Cache-Control")
+        and not (session is not None and session.accessed)
+        and _varies_only_on_cookie(response)
+    )
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD") or not _is_anonymous(request):
+            return self.get_response(request)
+        site = get_site_for_request(request)
+        if site is None:
+            return self.get_response(request)
+
+        key = _cache_key(request, site)
+        entry = cache.get(key)
+        if entry is not None and entry["versions"] == _versions(entry["page_id"]):
+            response = HttpResponse(entry["content"], status=entry["status"])
+            for header, value in entry["headers"]:
+                response[header] = value
+            response["X-Page-Cache"] = "hit"
+            return get_conditional_response(
+                request, etag=response.get("ETag"), response=response
+            )
+
+        response = self.get_response(request)
+        # Only responses that set no cookies get an ETag: a page that sets
+        # the CSRF cookie contains a token which a stale copy must not reuse.
+        etag = getattr(request, "page_etag", None)
+        if (
+            etag
+            and response.status_code == 200
+            and not response.cookies
+            and not response.has_header("ETag")
+        ):
+            response["ETag"] = etag
+        if _is_cacheable(request, response):
+            entry = {
+                "page_id": request.page_cache_page_id,
+                "versions": request.page_cache_versions,
+                "status": response.status_code,
+                "content": response.content,
+                "headers": [
+                    (header, response[header])
+                    for header in CACHED_HEADERS
+                    if response.has_header(header)
+                ],
+            }
+            cache.set(key, entry, PAGE_CACHE_TIMEOUT)
+            response["X-Page-Cache"] = "miss"
+        return response
+
+
+def purge_all():
+    """Drop every cached page, e.g. after a settings or snippet change."""
+    bump_cache_version(PAGE_CACHE_VERSION)
+
+
+def purge_pages(page_ids):
+    bump_cache_version(*(_page_version_name(page_id) for page_id in page_ids))
+
+
+def purge_for_page(page):
+    """
+    Drop the cached output of ``page`` and of every page that renders it.
+
+    That is the page itself, its ancestors (listing pages and the home page
+    sections that embed it), its descendants (their breadcrumbs show its
+    title) and the pages that reference it. Pages in (or just removed from)
+    the menu or in the footer, and pages referenced from snippets, appear
+    everywhere, so those purge all pages.
+    """
+    in_menu = page.show_in_menus or getattr(page, "_was_in_menu", False)
+    if in_menu or page.pk in get_footer_page_ids():
+        purge_all()
+        return
+
+    page_ids = {page.pk}
+    page_ids.update(page.get_ancestors().values_list("pk", flat=True))
+    page_ids.update(page.get_descendants().values_list("pk", flat=True))
+    for reference in ReferenceIndex.get_references_to(page).select_related(
+        "base_content_type"
+    ):
+        model = reference.base_content_type.model_class()
+        if model is not None and issubclass(model, Page):
+            page_ids.add(int(reference.object_id))
+        else:
+            purge_all()
+            return
+    purge_pages(page_ids)
@@ -0,0 +1,154 @@
+"""
+Static copies of the public site.
+
+``prerender_site`` renders every live page through the normal request stack
+and writes it as ``<output>/<hostname>/<path>/index.html``, next to the
+site's ``sitemap.xml`` and ``404.html``, so WhiteNoise (``WHITENOISE_ROOT``
+with ``WHITENOISE_INDEX_FILE``) or any static server can serve a site's
+directory directly. Pages whose response sets cookies, i.e. pages with a
+CSRF-protected form, stay on Django, as do routes below pages (e.g. a
+listing's ``cards/``), query strings, search and payments.
+
+A manifest per site records the version (see ``base.page_cache``) each page
+was last rendered at. Since versions move when a publish affects a page,
+re-running the command only re-renders those pages and deletes the files of
+pages that are no longer live.
+"""
+
+import json
+import os
+from urllib.parse import unquote
+
+from django.test import Client
+from wagtail.models import Page, Site
+
+from base.page_cache import get_page_version
+
+NOT_FOUND_PATH = "/404-prerender/"
+
+
+def _client(site):
+    host = site.hostname
+    if site.port not in (80, 443):
+        host = f"{host}:{site.port}"
+    return Client(HTTP_HOST=host, raise_request_exception=False)
+
+
+def _file_path(site_root, url_path):
+    """Where the page at ``url_path`` is written below ``site_root``."""
+    parts = [part for part in unquote(url_path).split("/") if part]
+    if any(part in (".", "..") for part in parts):
+        raise ValueError(f"Unsafe page path {url_path!r}.")
+    return os.path.join(site_root, *parts, "index.html")
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    # Replace atomically so a static server never serves half a file.
+    os.replace(tmp_path, path)
+
+
+def _remove(site_root, path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    directory = os.path.dirname(path)
+    while directory != site_root:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            # Not empty: other pages live below it.
+            break
+        directory = os.path.dirname(directory)
+
+
+def render_pages(site_id, site_root, pages):
+    """
+    Render ``pages`` (``(url_path, version)`` pairs) of a site to files.
+
+    Returns ``{url_path: (version, written)}``; pages that did not render to a
+    cookie-free 200 are not written and left to Django.
+    """
+    site = Site.objects.get(pk=site_id)
+    client = _client(site)
+    secure = site.port == 443
+    rendered = {}
+    for url_path, version in pages:
+        path = _file_path(site_root, url_path)
+        response = client.get(url_path, secure=secure)
+        written = response.status_code == 200 and not response.cookies
+        if written:
+            _write(path, response.content)
+        else:
+            _remove(site_root, path)
+        rendered[url_path] = (version, written)
+    return rendered
+
+
+def render_site_files(site, site_root):
+    """Write the sitemap and the 404 page of ``site``."""
+    client = _client(site)
+    secure = site.port == 443
+    response = client.get("/sitemap.xml", secure=secure)
+    if response.status_code == 200:
+        _write(os.path.join(site_root, "sitemap.xml"), response.content)
+    response = client.get(NOT_FOUND_PATH, secure=secure)
+    if response.status_code == 404:
+        _write(os.path.join(site_root, "404.html"), response.content)
+
+
+def get_site_pages(site):
+    """``{url_path: version}`` for the live, routable pages of ``site``."""
+    pages = {}
+    for page in (
+        Page.objects.live()
+        .descendant_of(site.root_page, inclusive=True)
+        .order_by("path")
+    ):
+        url_parts = page.get_url_parts()
+        if url_parts is None or url_parts[0] != site.pk:
+            continue
+        pages[url_parts[2]] = get_page_version(page)
+    return pages
+
+
+def _manifest_path(output, site):
+    # Beside, not inside, the site directory so it is never served.
+    return os.path.join(output, f"{site.hostname}.json")
+
+
+def read_manifest(output, site):
+    try:
+        with open(_manifest_path(output, site)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_manifest(output, site, manifest):
+    path = _manifest_path(output, site)
+    os.makedirs(output, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def get_stale_pages(site_root, pages, manifest):
+    """The pages rendered for an older version, or whose file has gone missing."""
+    stale = {}
+    for url_path, version in pages.items():
+        rendered_version, written = manifest.get(url_path, (None, False))
+        if rendered_version != version or (
+            written and not os.path.exists(_file_path(site_root, url_path))
+        ):
+            stale[url_path] = version
+    return stale
+
+
+def remove_pages(site_root, url_paths):
+    for url_path in url_paths:
+        _remove(site_root, _file_path(site_root, url_path))
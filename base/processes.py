@@ -0,0 +1,21 @@
+"""
+Worker process setup for management commands that use a process pool.
+
+Workers start as a fork of the command on Linux but as a fresh interpreter
+(``spawn``) on macOS and Windows, and under ``forkserver``. A spawned worker
+has an empty app registry, so the pool initializer sets Django up before any
+task is unpickled. This module must stay importable before ``django.setup()``.
+"""
+
+import django
+from django.apps import apps
+from django.db import connections
+
+
+def init_worker():
+    """Process pool initializer: make Django usable in a worker process."""
+    if not apps.ready:
+        django.setup()
+    # Forked workers must open their own database connections rather than
+    # share the sockets inherited from the parent.
+    connections.close_all()
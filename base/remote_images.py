@@ -0,0 +1,278 @@
+"""
+Local copies of images that editors link by URL instead of uploading.
+
+Gallery slides (`ProductImage.image_url`) and `ImageUrlBlock` may point at any
+remote image. Rendering those URLs raw means a third-party fetch on every
+view, no resizing and no dimensions. Instead, each URL is recorded as a
+`RemoteImage` when its page is published, downloaded once in the background
+into a regular Wagtail image, and from then on rendered through the usual
+renditions. Until the download has finished, templates fall back to the
+remote URL.
+
+Downloads only connect to public addresses: each host (including redirect
+targets) is resolved, rejected if any address is private, loopback,
+link-local or otherwise non-global, and the connection is made to the
+address that was checked.
+"""
+
+import hashlib
+import ipaddress
+import os
+import socket
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.images import ImageFile
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image as PILImage
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from wagtail.images import get_image_model
+
+from base.models import RemoteImage
+
+# Sent with `remote_image` once a URL has been downloaded, so read models that
+# embed images (e.g. product cards) can pick up the local copy.
+remote_image_fetched = Signal()
+
+REMOTE_IMAGE_TIMEOUT = getattr(settings, "REMOTE_IMAGE_TIMEOUT", (5, 30))
+REMOTE_IMAGE_MAX_BYTES = getattr(
+    settings, "REMOTE_IMAGE_MAX_BYTES", 20 * 1024 * 1024
+)
+REMOTE_IMAGE_MAX_REDIRECTS = 5
+REMOTE_IMAGE_CACHE_TIMEOUT = 60 * 60 * 24
+REMOTE_IMAGE_PENDING_CACHE_TIMEOUT = 60 * 5
+
+# Formats Wagtail can render; anything else is left as a remote link.
+IMAGE_EXTENSIONS = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+    "AVIF": "avif",
+}
+
+URL_MAX_LENGTH = RemoteImage._meta.get_field("url").max_length
+
+
+class RemoteImageError(Exception):
+    pass
+
+
+def _cache_key(url):
+    return "remote-image:" + hashlib.sha1(url.encode()).hexdigest()
+
+
+def _clean_urls(urls):
+    return [
+        url for url in dict.fromkeys(urls) if url and len(url) <= URL_MAX_LENGTH
+    ]
+
+
+def get_remote_images(urls):
+    """
+    Map each URL that has a local copy to its Wagtail image.
+
+    Lookups go to the cache first and then to the database. URLs without a
+    local copy (not recorded yet, pending or failed) are left out of the
+    result. This runs while rendering, so it never queues downloads; that
+    happens on publish and in `manage.py fetch_remote_images`.
+    """
+    urls = _clean_urls(urls)
+    if not urls:
+        return {}
+
+    keys = {_cache_key(url): url for url in urls}
+    found = {keys[key]: image for key, image in cache.get_many(keys).items()}
+    missing = [url for url in urls if url not in found]
+    if missing:
+        rows = RemoteImage.objects.filter(url__in=missing).select_related("image")
+        images = {row.url: row.image for row in rows if row.image is not None}
+        fetched = {}
+        for url in missing:
+            found[url] = images.get(url)
+            if found[url] is not None:
+                fetched[_cache_key(url)] = found[url]
+        cache.set_many(fetched, REMOTE_IMAGE_CACHE_TIMEOUT)
+        # Remember URLs without a local copy only briefly; the fetch task also
+        # clears the key when it finishes.
+        cache.set_many(
+            {_cache_key(url): False for url in missing if found[url] is None},
+            REMOTE_IMAGE_PENDING_CACHE_TIMEOUT,
+        )
+    return {url: image for url, image in found.items() if image}
+
+
+def queue_remote_images(urls):
+    """Record URLs not seen before and queue them for download."""
+    from base.tasks import fetch_remote_image_task
+
+    urls = _clean_urls(urls)
+    if not urls:
+        return 0
+    known = set(
+        RemoteImage.objects.filter(url__in=urls).values_list("url", flat=True)
+    )
+    new = [RemoteImage(url=url) for url in urls if url not in known]
+    RemoteImage.objects.bulk_create(new, ignore_conflicts=True)
+    pending = RemoteImage.objects.filter(
+        url__in=[remote.url for remote in new], status=RemoteImage.Status.PENDING
+    )
+    for pk in pending.values_list("pk", flat=True):
+        fetch_remote_image_task.enqueue(pk)
+    return len(new)
+
+
+def _is_public_address(address):
+    address = ipaddress.ip_address(address.split("%", 1)[0])
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+def _resolve_public(host, port):
+    """Return an address for ``host``, refusing hosts with a non-public one."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError) as e:
+        raise RemoteImageError(f"Cannot resolve {host}: {e}") from e
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        if not _is_public_address(address):
+            raise RemoteImageError(f"{host} resolves to a non-public address.")
+    return addresses[0]
+
+
+class _PublicAddressMixin:
+    def _new_conn(self):
+        # Connect to the address that was checked, so the host cannot resolve
+        # somewhere else between the check and the connection.
+        self._dns_host = _resolve_public(self._dns_host, self.port)
+        return super()._new_conn()
+
+
+class _PublicHTTPConnection(_PublicAddressMixin, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicAddressMixin, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class _PublicAddressAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PublicHTTPConnectionPool,
+            "https": _PublicHTTPSConnectionPool,
+        }
+
+
+def _session():
+    session = requests.Session()
+    # No proxies from the environment: the address check must see the real host.
+    session.trust_env = False
+    session.max_redirects = REMOTE_IMAGE_MAX_REDIRECTS
+    session.mount("http://", _PublicAddressAdapter())
+    session.mount("https://", _PublicAddressAdapter())
+    return session
+
+
+def _download(url):
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise RemoteImageError("Only http and https URLs can be downloaded.")
+    try:
+        with _session() as session, session.get(
+            url,
+            stream=True,
+            timeout=REMOTE_IMAGE_TIMEOUT,
+            headers={"Accept": "image/*"},
+        ) as response:
+            response.raise_for_status()
+            length = int(response.headers.get("Content-Length") or 0)
+            if length > REMOTE_IMAGE_MAX_BYTES:
+                raise RemoteImageError(f"Image is too large ({length} bytes).")
+            data = BytesIO()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data.write(chunk)
+                if data.tell() > REMOTE_IMAGE_MAX_BYTES:
+                    raise RemoteImageError("Image is too large.")
+    except requests.RequestException as e:
+        raise RemoteImageError(str(e)) from e
+
+    try:
+        with PILImage.open(data) as image:
+            image_format = image.format
+            image.verify()
+    except (OSError, PILImage.DecompressionBombError) as e:
+        raise RemoteImageError(f"Not a readable image: {e}") from e
+    if image_format not in IMAGE_EXTENSIONS:
+        raise RemoteImageError(f"Unsupported image format {image_format}.")
+    data.seek(0)
+    return data, IMAGE_EXTENSIONS[image_format]
+
+
+def _store(url, data, extension):
+    Image = get_image_model()
+    parts = urlsplit(url)
+    digest = hashlib.sha1(url.encode()).hexdigest()[:12]
+    image = Image(
+        title=(os.path.basename(parts.path) or parts.hostname)[:255],
+        file=ImageFile(data, name=f"remote-{digest}.{extension}"),
+    )
+    image._set_image_file_metadata()
+    # Reuse an identical upload rather than storing the file twice.
+    duplicate = Image.objects.filter(file_hash=image.file_hash).first()
+    if duplicate is not None:
+        return duplicate
+    image.save()
+    return image
+
+
+def fetch_remote_image(remote):
+    """
+    Download ``remote.url`` into a Wagtail image and record the outcome.
+
+    Returns the image, or None if the download failed (the error is kept on
+    the row and the URL keeps rendering as a remote link).
+    """
+    remote.attempts += 1
+    try:
+        remote.image = _store(remote.url, *_download(remote.url))
+    except RemoteImageError as e:
+        remote.status = RemoteImage.Status.FAILED
+        remote.error = str(e)
+    else:
+        remote.status = RemoteImage.Status.FETCHED
+        remote.error = ""
+        remote.fetched_at = timezone.now()
+    remote.save()
+    cache.delete(_cache_key(remote.url))
+
+    if remote.status == RemoteImage.Status.FETCHED:
+        remote_image_fetched.send(sender=RemoteImage, remote_image=remote)
+    return remote.image
+
+
+def get_remote_image_page_models():
+    """Page types that declare ``get_remote_image_urls``."""
+    from wagtail.models import get_page_models
+
+    return [
+        model
+        for model in get_page_models()
+        if hasattr(model, "get_remote_image_urls")
+    ]
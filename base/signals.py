@@ -0,0 +1,142 @@
+from django.apps import apps
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from wagtail.contrib.settings.models import BaseGenericSetting, BaseSiteSetting
+from wagtail.models import Page, Site, get_page_models
+from wagtail.snippets import models as snippet_models
+from wagtail.signals import (
+    page_published,
+    page_unpublished,
+    post_page_move,
+    published,
+    unpublished,
+)
+
+from base.cache import bump_cache_version
+from base.footer import FOOTER_CACHE_VERSION
+from base.header import HEADER_CACHE_VERSION
+from base.models import FooterSettings, Header
+from base.navigation import NAVIGATION_CACHE_VERSION
+from base.page_cache import purge_all, purge_for_page
+from base.remote_images import queue_remote_images, remote_image_fetched
+from base.sites import SITE_CACHE_VERSION
+from base.tasks import runs_in_background, warm_page_renditions_task
+
+
+# Connected before the rendition warming below, so that with an immediate
+# task backend the local copies exist by the time renditions are warmed.
+@receiver(page_published)
+def enqueue_remote_image_fetches(sender, instance, **kwargs):
+    if hasattr(instance, "get_remote_image_urls"):
+        queue_remote_images(instance.get_remote_image_urls())
+
+
+@receiver(page_published)
+def enqueue_rendition_warming(sender, instance, **kwargs):
+    # Inline warming would render every rendition inside the editor's publish
+    # request; without a worker, leave them to the first view or to
+    # `manage.py warm_renditions`.
+    if getattr(instance, "rendition_specs", None) and runs_in_background(
+        warm_page_renditions_task
+    ):
+        warm_page_renditions_task.enqueue(instance.pk)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+def bump_navigation_version(sender, **kwargs):
+    bump_cache_version(NAVIGATION_CACHE_VERSION)
+
+
+@receiver(post_delete)
+def bump_navigation_version_on_delete(sender, instance, **kwargs):
+    if isinstance(instance, Page):
+        bump_cache_version(NAVIGATION_CACHE_VERSION)
+
+
+@receiver(published, sender=Header)
+@receiver(unpublished, sender=Header)
+@receiver(post_save, sender=Header)
+@receiver(post_delete, sender=Header)
+def bump_header_version(sender, **kwargs):
+    bump_cache_version(HEADER_CACHE_VERSION)
+
+
+@receiver(post_save, sender=FooterSettings)
+@receiver(post_delete, sender=FooterSettings)
+def bump_footer_version(sender, **kwargs):
+    bump_cache_version(FOOTER_CACHE_VERSION)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def bump_site_version(sender, **kwargs):
+    bump_cache_version(SITE_CACHE_VERSION)
+
+
+def record_menu_membership(sender, instance, update_fields=None, **kwargs):
+    # Publishing saves every field; remember whether the page was in the menu
+    # so that taking it out of the menu still purges every page.
+    if instance.pk and update_fields is None:
+        instance._was_in_menu = Page.objects.filter(
+            pk=instance.pk, show_in_menus=True
+        ).exists()
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def purge_page_cache(sender, instance, **kwargs):
+    purge_for_page(instance)
+
+
+@receiver(post_page_move)
+@receiver(remote_image_fetched)
+def purge_page_cache_all(sender, **kwargs):
+    purge_all()
+
+
+@receiver(post_delete)
+def purge_page_cache_on_delete(sender, instance, **kwargs):
+    if isinstance(instance, Page):
+        purge_all()
+
+
+def purge_page_cache_on_save(sender, **kwargs):
+    purge_all()
+
+
+def get_site_wide_models():
+    """Settings, sites and snippets: models whose rows can appear on any page."""
+    site_wide = {Site}
+    site_wide.update(
+        model
+        for model in apps.get_models()
+        if issubclass(model, (BaseSiteSetting, BaseGenericSetting))
+    )
+    site_wide.update(snippet_models.SNIPPET_MODELS)
+    # Apps listed before wagtail.snippets get here while their
+    # @register_snippet registrations are still deferred.
+    for registerable, _ in snippet_models.DEFERRED_REGISTRATIONS:
+        if isinstance(registerable, str):
+            registerable = import_string(registerable)
+        model = getattr(registerable, "model", registerable)
+        if isinstance(model, type) and issubclass(model, Model):
+            site_wide.add(model)
+    return site_wide
+
+
+def connect_page_models():
+    """Track menu membership on saves of page models only; see BaseConfig."""
+    for model in get_page_models():
+        pre_save.connect(record_menu_membership, sender=model)
+
+
+def connect_site_wide_models():
+    """Purge the page cache on changes to any site-wide model; see BaseConfig."""
+    for model in get_site_wide_models():
+        post_save.connect(purge_page_cache_on_save, sender=model)
+        post_delete.connect(purge_page_cache_on_save, sender=model)
@@ -0,0 +1,86 @@
+"""
+Request-to-Site resolution from an in-memory copy of the Site table.
+
+Wagtail resolves the site for a request with a Site query (see
+``wagtail.models.sites.get_site_for_hostname``). This module keeps all sites,
+with their root pages, per process (see ``base.cache.local_cached``),
+invalidated by the ``"sites"`` version counter that ``base.signals`` bumps on
+Site save/delete, and the ``"navigation"`` counter for root page changes.
+
+``SiteMiddleware`` resolves the site once per request and stores it where
+``Site.find_for_request`` looks first, so Wagtail's routing, ``for_request``
+settings lookups and our template tags all share it.
+"""
+
+import copy
+
+from django.http.request import split_domain_port
+from wagtail.models import Site
+
+from base.cache import local_cached
+from base.navigation import NAVIGATION_CACHE_VERSION
+
+SITE_CACHE_VERSION = "sites"
+
+
+def _load_sites():
+    return list(Site.objects.select_related("root_page"))
+
+
+def match_site(sites, hostname, port):
+    """
+    Pick the site for ``hostname``/``port`` (an int, or None) the way Wagtail
+    does: an exact hostname and port match, then the default site if it has
+    this hostname, then the only site with this hostname, then the default
+    site.
+    """
+    for site in sites:
+        if site.hostname == hostname and site.port == port:
+            return site
+    default = next((site for site in sites if site.is_default_site), None)
+    if default is not None and default.hostname == hostname:
+        return default
+    matches = [site for site in sites if site.hostname == hostname]
+    if len(matches) == 1:
+        return matches[0]
+    return default
+
+
+def find_site(hostname, port):
+    """The Site for a hostname and port, or None; costs no queries when warm."""
+    sites = local_cached(
+        SITE_CACHE_VERSION, _load_sites, SITE_CACHE_VERSION, NAVIGATION_CACHE_VERSION
+    )
+    site = match_site(sites, hostname, port)
+    if site is None:
+        return None
+    # Hand out copies: the cached instances are shared by every request.
+    site = copy.copy(site)
+    site.root_page = copy.copy(site.root_page)
+    return site
+
+
+def get_site_for_request(request):
+    """Resolve and remember the Site for ``request``; see ``Site.find_for_request``."""
+    if request is None:
+        return None
+    if not hasattr(request, "_wagtail_site"):
+        # Use `_get_raw_host` to avoid ALLOWED_HOSTS checks, like Wagtail.
+        hostname = split_domain_port(request._get_raw_host())[0]
+        try:
+            port = int(request.get_port())
+        except (TypeError, ValueError):
+            port = None
+        request._wagtail_site = find_site(hostname, port)
+    return request._wagtail_site
+
+
+class SiteMiddleware:
+    """Resolve the request's Site up front from the in-memory site map."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        get_site_for_request(request)
+        return self.get_response(request)
@@ -0,0 +1,34 @@
+from django_tasks import task
+from django_tasks.backends.immediate import ImmediateBackend
+
+from wagtail.models import Page
+
+from base.images import warm_page_renditions
+from base.models import RemoteImage
+from base.remote_images import fetch_remote_image
+
+
+def runs_in_background(background_task):
+    """Whether enqueueing a task hands it to a worker rather than running inline."""
+    return not isinstance(background_task.get_backend(), ImmediateBackend)
+
+
+@task()
+def warm_page_renditions_task(page_id):
+    """Pre-generate the renditions a freshly published page will render."""
+    page = Page.objects.live().filter(pk=page_id).specific().first()
+    if page is None:
+        return 0
+    return warm_page_renditions(page)
+
+
+@task()
+def fetch_remote_image_task(remote_image_id):
+    """Download a linked image into the image library; see base.remote_images."""
+    remote = RemoteImage.objects.filter(
+        pk=remote_image_id, status=RemoteImage.Status.PENDING
+    ).first()
+    if remote is None:
+        return None
+    image = fetch_remote_image(remote)
+    return image.pk if image is not None else None
@@ -1,21 +1,42 @@
 from django import template
+
+from base.cache import local_cached
+from base.navigation import NAVIGATION_CACHE_VERSION
 from contact.models import ContactPage
 
 register = template.Library()
 
+
+def _load_contact_section():
+    """The live ContactPage with its inline relations, and its form class."""
+    contact_page = (
+        ContactPage.objects.live()
+        .prefetch_related(
+            "form_fields", "contact_methods", "contact_stats", "social_links"
+        )
+        .first()
+    )
+    if contact_page is None:
+        return None, None
+    return contact_page, contact_page.get_form_class()
+
+
 @register.inclusion_tag('includes/sections/contact.html', takes_context=True)
 def contact_section(context):
-    # Get the first ContactPage instance
-    contact_page = ContactPage.objects.live().first()
-    
+    # The page and its generated form class are kept per process and rebuilt
+    # whenever a page is published, unpublished or moved (see base.cache).
+    contact_page, form_class = local_cached(
+        "contact_section", _load_contact_section, NAVIGATION_CACHE_VERSION
+    )
+
     if contact_page:
-        # If a ContactPage exists, get its form
-        form = contact_page.get_form(page=contact_page)
+        # If a ContactPage exists, get a fresh form for this request
+        form = form_class(page=contact_page, **contact_page.get_form_parameters())
         return {
             'page': contact_page,
             'form': form,
             'request': context.get('request'),
         }
-    
+
     # If no ContactPage exists, return an empty context
     return {}
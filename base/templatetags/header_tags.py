@@ -1,13 +1,13 @@
 from django import template
-from base.models import Header
+from base.header import get_live_header
 
 register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
 def header_snippet(context):
-    """Return the first Header snippet instance or None."""
+    """Return the live Header snippet (see base.header) or None."""
     try:
-        return Header.objects.first()
+        return get_live_header()
     except Exception:
         return None
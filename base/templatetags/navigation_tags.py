@@ -1,23 +1,20 @@
 from django import template
-from wagtail.models import Page, Site
+
+from base.navigation import MenuItem, get_breadcrumbs, get_menu_tree, mark_active
+from base.sites import get_site_for_request
 
 register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
 def get_site_root(context):
-    return Site.find_for_request(context["request"]).root_page
+    return get_site_for_request(context["request"]).root_page
 
 
 def has_children(page):
     return page.get_children().live().exists()
 
 
-def has_menu_children(page):
-    return page.get_children().live().in_menu().exists()
-
-
-
 def is_active(page, current_page):
     return current_page.url_path.startswith(page.url_path) if current_page else False
 
@@ -25,38 +22,25 @@ def is_active(page, current_page):
 
 @register.inclusion_tag("tags/top_menu.html", takes_context=True)
 def top_menu(context, parent, calling_page=None):
-    menuitems = parent.get_children().live().in_menu()
-    for menuitem in menuitems:
-        # We don't directly check if calling_page is None since the template
-        # engine can pass an empty string to calling_page
-        # if the variable passed as calling_page does not exist.
-        menuitem.active = (
-            calling_page.url_path.startswith(menuitem.url_path)
-            if calling_page
-            else False
-        )
+    menuitems = mark_active(get_menu_tree(parent), calling_page)
     return {
         "calling_page": calling_page,
         "menuitems": menuitems,
-        # required by the pageurl tag that we want to use within this template
         "request": context["request"],
     }
 
 
 @register.inclusion_tag("tags/top_menu_children.html", takes_context=True)
 def top_menu_children(context, parent, calling_page=None):
-    menuitems_children = parent.get_children().live().in_menu()
-    for menuitem in menuitems_children:
-        menuitem.has_dropdown = has_menu_children(menuitem)
-        menuitem.active = (
-            calling_page.url_path.startswith(menuitem.url_path)
-            if calling_page
-            else False
-        )
-        menuitem.children = menuitem.get_children().live().in_menu()
+    # `parent` is normally a MenuItem from top_menu, which already holds its
+    # children; a Page gets its own (cached) tree.
+    if isinstance(parent, MenuItem):
+        menuitems_children = parent.children
+    else:
+        menuitems_children = get_menu_tree(parent)
     return {
         "parent": parent,
-        "menuitems_children": menuitems_children,
+        "menuitems_children": mark_active(menuitems_children, calling_page),
         "request": context["request"],
     }
 
@@ -67,7 +51,7 @@ def breadcrumbs(context):
         # When on the home page, displaying breadcrumbs is irrelevant.
         ancestors = ()
     else:
-        ancestors = Page.objects.ancestor_of(self, inclusive=True).filter(depth__gt=1)
+        ancestors = get_breadcrumbs(self)
     return {
         "ancestors": ancestors,
         "request": context["request"],
@@ -0,0 +1,40 @@
+from django import template
+
+from base.images import RenditionPolicy, batch_renditions as resolve_renditions, get_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def batch_renditions(items, *filter_specs):
+    """
+    Resolve renditions for a whole list of images up front.
+
+    Usage: {% batch_renditions images "fill-1200x800" page.preview_policy as renditions %}
+
+    ``images`` may hold images or gallery rows with an ``image`` attribute, and a
+    RenditionPolicy stands for all of its filter specs. The result maps image id
+    to ``{filter_spec: rendition}``, and later ``{% image %}`` / ``{% picture_for %}``
+    calls on the same image objects reuse the resolved renditions.
+    """
+    specs = []
+    for spec in filter_specs:
+        if isinstance(spec, RenditionPolicy):
+            specs.extend(spec.filter_specs)
+        else:
+            specs.append(spec)
+    return resolve_renditions(items, *specs)
+
+
+@register.simple_tag
+def picture_for(image, policy):
+    """
+    Describe ``image`` rendered under a RenditionPolicy.
+
+    Usage: {% picture_for item.image page.slider_image_policy as slide %}
+
+    The result (``src``, ``srcset``, ``sizes``, ``width``, ``height`` and
+    ``sources``) is what ``includes/picture.html`` renders; it is None when the
+    image or its file is missing.
+    """
+    return get_picture(image, policy)
@@ -1,6 +1,7 @@
 from django import template
-from wagtail.models import Site
-from base.models import FooterSettings
+from django.template.loader import render_to_string
+from base.footer import render_footer
+from base.sites import get_site_for_request
 
 register = template.Library()
 
@@ -28,27 +29,17 @@ def render_why_us_section(why_us_page):
 #     }
 
 
-@register.inclusion_tag("includes/footer.html", takes_context=True)
+@register.simple_tag(takes_context=True)
 def footer(context):
     """
-    An inclusion tag to render the footer.
-    It fetches the FooterSettings for the current site.
+    Render the footer for the current site.
+
+    The HTML is cached per site; see base.footer.
     """
-    # Get the request from the context
     request = context["request"]
+    current_site = get_site_for_request(request)
 
-    # Manually find the site using the method that works, instead of relying on middleware.
-    current_site = Site.find_for_request(request)
-
-    # If a site is found, get the settings for it.
-    if current_site:
-        return {
-            "settings": FooterSettings.for_site(current_site),
-            "request": request,
-            'current_site': current_site, 
-        }
-
-    # Return an empty context if no site is found, to prevent errors.
-    return {
-        "request": request,
-    }
+    # Render an empty footer if no site is found, to prevent errors.
+    if current_site is None:
+        return render_to_string("includes/footer.html", {"request": request})
+    return render_footer(request, current_site)
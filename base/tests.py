@@ -1,3 +1,346 @@
-from django.test import TestCase
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.signals import template_rendered
+from django.utils.cache import patch_vary_headers
+
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page, Site
+from wagtail.signals import page_published
+
+from base.cache import (
+    LOCAL_CACHE_TIMEOUT,
+    CacheVersionsMiddleware,
+    bump_cache_version,
+    local_cached,
+)
+from base.models import RemoteImage, StandardPage, Testimonial
+from base.processes import init_worker
+from base.remote_images import fetch_remote_image, get_remote_images
+from base.sites import get_site_for_request
+from base.tasks import runs_in_background, warm_page_renditions_task
+
+
+def _apps_ready():
+    from django.apps import apps
+
+    return apps.ready
+
+
+class InitWorkerTests(SimpleTestCase):
+    def test_spawned_worker_sets_up_django(self):
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=context, initializer=init_worker
+        ) as executor:
+            self.assertIs(executor.submit(_apps_ready).result(), True)
+
+
+class LocalCachedTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.dict("base.cache._local_cache", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.build = mock.Mock(side_effect=lambda: self.build.call_count)
+
+    def get(self):
+        return local_cached("test-local-cached", self.build)
+
+    def test_reuses_value_until_version_bump(self):
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.get(), 1)
+        bump_cache_version("test-local-cached")
+        self.assertEqual(self.get(), 2)
+
+    def test_rebuilds_after_timeout(self):
+        with mock.patch("base.cache.time.monotonic", return_value=1000):
+            self.assertEqual(self.get(), 1)
+        later = 1000 + LOCAL_CACHE_TIMEOUT
+        with mock.patch("base.cache.time.monotonic", return_value=later):
+            self.assertEqual(self.get(), 2)
+
+    def in_request(self, func):
+        middleware = CacheVersionsMiddleware(lambda request: func())
+        return middleware(RequestFactory().get("/"))
+
+    def test_reads_counters_once_per_request(self):
+        other = mock.Mock(return_value="other")
+        self.get()
+        local_cached("test-local-cached-other", other)
+
+        def render():
+            self.get()
+            local_cached("test-local-cached-other", other)
+            self.get()
+
+        with mock.patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            self.in_request(render)
+            self.in_request(render)
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_bump_during_request_rebuilds(self):
+        def render():
+            self.get()
+            bump_cache_version("test-local-cached")
+            return self.get()
+
+        self.assertEqual(self.in_request(render), 2)
+
+
+class SiteResolutionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.site_8000 = Site.objects.create(
+            hostname="example.com", port=8000, root_page=root
+        )
+        cls.site_8001 = Site.objects.create(
+            hostname="example.com", port=8001, root_page=root
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_site(self, port):
+        request = RequestFactory().get(
+            "/", HTTP_HOST=f"example.com:{port}", SERVER_PORT=str(port)
+        )
+        return get_site_for_request(request)
+
+    def test_matches_port_on_shared_hostname(self):
+        self.assertEqual(self.get_site(8000).pk, self.site_8000.pk)
+        self.assertEqual(self.get_site(8001).pk, self.site_8001.pk)
+
+    def test_unknown_port_falls_back_to_default_site(self):
+        self.assertTrue(self.get_site(8002).is_default_site)
+
+
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.page = root.add_child(instance=StandardPage(title="About", slug="about"))
+
+    def setUp(self):
+        # The first request creates the site's settings rows, which purges.
+        cache.clear()
+        self.client.get(self.page.url)
+        cache.clear()
+
+    def get(self, **kwargs):
+        response = self.client.get(self.page.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def serve_with_vary(self, *headers):
+        serve = Page.serve
+
+        def serve_with_vary(page, request, *args, **kwargs):
+            response = serve(page, request, *args, **kwargs)
+            patch_vary_headers(response, headers)
+            return response
+
+        return mock.patch.object(StandardPage, "serve", serve_with_vary)
+
+    def test_hit_keeps_vary_header(self):
+        with self.serve_with_vary("Cookie"):
+            self.assertEqual(self.get()["X-Page-Cache"], "miss")
+            response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertEqual(response["Vary"], "Cookie")
+
+    def test_response_varying_on_other_headers_is_not_cached(self):
+        with self.serve_with_vary("Accept-Language"):
+            self.get()
+            response = self.get()
+        self.assertFalse(response.has_header("X-Page-Cache"))
+
+    def test_messages_cookie_bypasses_cache(self):
+        self.get()
+        self.client.cookies["messages"] = "pending"
+        self.assertFalse(self.get().has_header("X-Page-Cache"))
+
+    def test_snippet_save_purges_cache(self):
+        self.get()
+        self.assertEqual(self.get()["X-Page-Cache"], "hit")
+        Testimonial.objects.create(quote="Great", author_name="Ann")
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+
+    def test_taking_page_out_of_menu_purges_every_page(self):
+        root = Site.objects.get(is_default_site=True).root_page
+        menu_page = root.add_child(
+            instance=StandardPage(title="Team", slug="team", show_in_menus=True)
+        )
+        self.get()
+        self.assertEqual(self.get()["X-Page-Cache"], "hit")
+        menu_page.show_in_menus = False
+        menu_page.save_revision().publish()
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+
+    def test_other_model_save_keeps_cache(self):
+        self.get()
+        RemoteImage.objects.create(url="https://images.example.com/a.png")
+        self.assertEqual(self.get()["X-Page-Cache"], "hit")
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.page = root.add_child(instance=StandardPage(title="About", slug="about"))
+
+    def setUp(self):
+        # The first request creates the site's settings rows, which purges.
+        cache.clear()
+        self.client.get(self.page.url)
+        cache.clear()
+        self.rendered = []
+        template_rendered.connect(self.record_template)
+        self.addCleanup(template_rendered.disconnect, self.record_template)
+
+    def record_template(self, sender, template, **kwargs):
+        self.rendered.append(template.name)
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        etag = self.client.get(self.page.url)["ETag"]
+        self.rendered.clear()
+
+        # A query string the page cache has not stored yet, so the 304 has to
+        # come from the before_serve_page hook rather than a cache hit.
+        response = self.client.get(f"{self.page.url}?ref=1", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.has_header("X-Page-Cache"))
+        self.assertEqual(self.rendered, [])
+
+    def test_stale_etag_renders_page(self):
+        response = self.client.get(self.page.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("base/standard_page.html", self.rendered)
+
+
+class RenditionWarmingTests(TestCase):
+    def setUp(self):
+        self.page = Site.objects.get(is_default_site=True).root_page.specific
+        self.page.rendition_specs = {"gallery_images": ("fill-80x80",)}
+
+    def publish(self):
+        page_published.send(sender=type(self.page), instance=self.page)
+
+    def test_immediate_backend_does_not_warm_on_publish(self):
+        self.assertFalse(runs_in_background(warm_page_renditions_task))
+        with mock.patch("base.tasks.warm_page_renditions") as warm:
+            self.publish()
+        warm.assert_not_called()
+
+    @mock.patch("base.signals.runs_in_background", return_value=True)
+    def test_queue_backend_warms_on_publish(self, runs_in_background):
+        with mock.patch("base.signals.warm_page_renditions_task") as task:
+            self.publish()
+        task.enqueue.assert_called_once_with(self.page.pk)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        status, headers, body = self.server.routes.get(self.path, (404, {}, b""))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _local_addresses_only(address):
+    return address == "127.0.0.1"
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RemoteImageDownloadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        cls.base_url = "http://127.0.0.1:%d" % cls.server.server_port
+        cls.server.routes = {
+            "/image.png": (
+                200,
+                {"Content-Type": "image/png"},
+                get_test_image_file().file.getvalue(),
+            ),
+            "/page.html": (200, {"Content-Type": "text/html"}, b"<html></html>"),
+            "/to-internal": (302, {"Location": "http://127.0.0.2:9/image.png"}, b""),
+        }
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.paths = []
+
+    def fetch(self, path):
+        remote = RemoteImage.objects.create(url=self.base_url + path)
+        fetch_remote_image(remote)
+        remote.refresh_from_db()
+        return remote
+
+    @mock.patch("base.remote_images._is_public_address", _local_addresses_only)
+    def test_downloads_image(self):
+        remote = self.fetch("/image.png")
+        self.assertEqual(remote.status, RemoteImage.Status.FETCHED)
+        self.assertEqual(remote.image.width, 640)
+
+    @mock.patch("base.remote_images._is_public_address", _local_addresses_only)
+    def test_rejects_non_image(self):
+        remote = self.fetch("/page.html")
+        self.assertEqual(remote.status, RemoteImage.Status.FAILED)
+        self.assertIsNone(remote.image)
+
+    def test_refuses_loopback_host(self):
+        remote = self.fetch("/image.png")
+        self.assertEqual(remote.status, RemoteImage.Status.FAILED)
+        self.assertIn("non-public address", remote.error)
+        self.assertEqual(self.server.paths, [])
+
+    @mock.patch("base.remote_images._is_public_address", _local_addresses_only)
+    def test_refuses_redirect_to_non_public_host(self):
+        remote = self.fetch("/to-internal")
+        self.assertEqual(remote.status, RemoteImage.Status.FAILED)
+        self.assertIn("non-public address", remote.error)
+        self.assertEqual(self.server.paths, ["/to-internal"])
+
+    def test_rendering_does_not_queue_downloads(self):
+        self.assertEqual(get_remote_images([self.base_url + "/image.png"]), {})
+        self.assertFalse(RemoteImage.objects.exists())
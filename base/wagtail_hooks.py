@@ -0,0 +1,13 @@
+from wagtail import hooks
+
+from base.page_cache import get_not_modified_response, mark_cacheable
+
+
+@hooks.register("before_serve_page")
+def mark_page_cacheable(page, request, serve_args, serve_kwargs):
+    mark_cacheable(request, page)
+
+
+@hooks.register("before_serve_page")
+def serve_not_modified(page, request, serve_args, serve_kwargs):
+    return get_not_modified_response(request, page)
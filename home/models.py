@@ -396,6 +396,13 @@ class HomePage(Page, ClusterableModel):
         PageChooserPanel("featured_why_us_section", "services.WhyUsPage"),
     ]
 
+    # Filter specs rendered by the home page sections, pre-generated on publish.
+    rendition_specs = {
+        "hero_image": ("fill-800x800",),
+        "about_main_image": ("fill-600x750",),
+        "about_secondary_image": ("fill-400x400",),
+    }
+
     def primary_cta_link(self):
         if self.hero_primary_cta_page:
             try:
@@ -1,8 +1,32 @@
 from django import forms
 
+from .models import Order
+
 
 class OrderForm(forms.Form):
     full_name = forms.CharField(max_length=255)
     email = forms.EmailField()
     preferred_platforms = forms.CharField(max_length=255)
     customization_notes = forms.CharField(widget=forms.Textarea, required=False)
+
+
+class OrderExportForm(forms.Form):
+    start = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    end = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}),
+        help_text="Orders created on this day are included.",
+    )
+    status = forms.ChoiceField(
+        choices=[("", "Any")] + Order.OrderStatus.choices, required=False
+    )
+    format = forms.ChoiceField(choices=[("csv", "CSV"), ("xlsx", "XLSX")])
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("start"), cleaned_data.get("end")
+        if start and end and start > end:
+            raise forms.ValidationError("The start date is after the end date.")
+        return cleaned_data
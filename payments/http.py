@@ -0,0 +1,199 @@
+"""
+Shared HTTP client for payment provider APIs.
+
+Each provider gets one ``ProviderClient`` per worker process (see
+``get_client``), so calls reuse pooled keep-alive connections instead of
+doing a TCP and TLS handshake each time. Every call is bounded by connect and
+read timeouts. Idempotent requests, and requests that never reached the
+gateway, are retried a few times with jittered backoff. A per-process circuit
+breaker fails calls fast while a gateway keeps failing, instead of tying up
+workers on timeouts.
+
+Request counts, errors and latency are recorded per provider endpoint in the
+default cache, which is shared by all workers; ``get_endpoint_metrics`` reads
+them back (see the ``payment_provider_metrics`` command).
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds.
+PROVIDER_TIMEOUT = getattr(settings, "PAYMENT_PROVIDER_TIMEOUT", (3.05, 20))
+PROVIDER_RETRIES = getattr(settings, "PAYMENT_PROVIDER_RETRIES", 2)
+PROVIDER_POOL_SIZE = getattr(settings, "PAYMENT_PROVIDER_POOL_SIZE", 10)
+
+# Consecutive failures that open the circuit, and how long it stays open.
+CIRCUIT_FAILURE_THRESHOLD = getattr(
+    settings, "PAYMENT_CIRCUIT_FAILURE_THRESHOLD", 5
+)
+CIRCUIT_RESET_TIMEOUT = getattr(settings, "PAYMENT_CIRCUIT_RESET_TIMEOUT", 30)
+
+METRICS_TIMEOUT = 60 * 60 * 24 * 7
+METRICS = ("requests", "errors", "duration_ms")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a gateway that has been failing."""
+
+
+class CircuitBreaker:
+    """
+    Stops calls after ``failure_threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed, a single trial call is let
+    through: if it succeeds the circuit closes again, otherwise it stays open
+    for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("The payment gateway is unavailable.")
+            # Let this call through as the trial; hold off the others until
+            # it has finished.
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def _metric_key(provider, endpoint, metric):
+    return f"payment-metrics:{provider}:{endpoint}:{metric}"
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, METRICS_TIMEOUT):
+            cache.incr(key, delta)
+
+
+def record_request(provider, endpoint, duration, error):
+    _incr(_metric_key(provider, endpoint, "requests"), 1)
+    _incr(_metric_key(provider, endpoint, "duration_ms"), int(duration * 1000))
+    if error:
+        _incr(_metric_key(provider, endpoint, "errors"), 1)
+
+
+def get_endpoint_metrics(provider, endpoint):
+    """``{"requests", "errors", "duration_ms"}`` totals for an endpoint."""
+    keys = {_metric_key(provider, endpoint, metric): metric for metric in METRICS}
+    values = cache.get_many(keys)
+    return {metric: values.get(key, 0) for key, metric in keys.items()}
+
+
+class ProviderClient:
+    """A pooled, timeout-bounded session for one provider's API."""
+
+    def __init__(self, provider, base_url):
+        self.provider = provider
+        self.base_url = base_url.rstrip("/")
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        retry = Retry(
+            total=PROVIDER_RETRIES,
+            connect=PROVIDER_RETRIES,
+            read=PROVIDER_RETRIES,
+            status=PROVIDER_RETRIES,
+            # Reads and 5xx responses are only retried for idempotent
+            # methods; a POST is retried only if it never reached the gateway.
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            status_forcelist=(502, 503, 504),
+            backoff_factor=0.2,
+            backoff_jitter=0.2,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=PROVIDER_POOL_SIZE, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, path, endpoint, **kwargs):
+        """
+        Send ``method`` to ``path`` below the base URL.
+
+        ``endpoint`` names the call in metrics and logs. Raises
+        ``CircuitOpenError`` without calling the gateway while the circuit is
+        open. Responses are returned as they are, including errors; 5xx
+        responses and connection errors count as failures for the circuit.
+        """
+        self.breaker.before_call()
+        kwargs.setdefault("timeout", PROVIDER_TIMEOUT)
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+        except requests.RequestException:
+            duration = time.monotonic() - start
+            self.breaker.record_failure()
+            record_request(self.provider, endpoint, duration, error=True)
+            logger.warning(
+                "%s %s failed after %.3fs", self.provider, endpoint, duration
+            )
+            raise
+
+        duration = time.monotonic() - start
+        failed = response.status_code >= 500
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        record_request(self.provider, endpoint, duration, error=not response.ok)
+        logger.info(
+            "%s %s returned %s in %.3fs",
+            self.provider,
+            endpoint,
+            response.status_code,
+            duration,
+        )
+        return response
+
+    def get(self, path, endpoint, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint, **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+
+# (provider, base_url) -> client; one set per worker process.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, base_url):
+    """The process-wide client for ``provider``, created on first use."""
+    key = (provider, base_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = ProviderClient(provider, base_url)
+    return client
@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from payments.providers import (
+    NOWPAYMENTS_IPN_MAX_BYTES,
+    NowPaymentsProvider,
+    canonical_json,
+)
+
+SECRET = "benchmark-secret"
+
+# A typical NOWPayments IPN.
+IPN = {
+    "payment_id": 5077125051,
+    "invoice_id": 4388540961,
+    "payment_status": "finished",
+    "pay_address": "0xd1cDE08A07cD25adEbEd35c3867a59228C09B606",
+    "price_amount": 170,
+    "price_currency": "usd",
+    "pay_amount": 155.38559757,
+    "actually_paid": 155.38559757,
+    "actually_paid_at_fiat": 0,
+    "pay_currency": "mana",
+    "order_id": "2c1ad1f0-4a5c-4b23-b8f6-5b1bd3b3ad3e",
+    "order_description": "Order for App - Basic",
+    "purchase_id": "6084744717",
+    "created_at": "2021-04-12T14:22:54.942Z",
+    "updated_at": "2021-04-12T14:23:06.244Z",
+    "outcome_amount": 1e-7,
+}
+
+
+def _sign(body):
+    message = canonical_json(body)
+    return hmac.new(SECRET.encode(), message, hashlib.sha512).hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time IPN signature verification on the raw body against parsing it "
+        "and calling verify_webhook_signature."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=500,
+            help="Calls per case, method and round.",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=40,
+            help="Rounds per case; the methods take turns and the fastest "
+            "round counts, which evens out a noisy machine.",
+        )
+
+    def handle(self, *args, **options):
+        provider = NowPaymentsProvider(api_key="", ipn_secret_key=SECRET)
+        body = json.dumps(IPN).encode()
+        # The same IPN with a number json.dumps would write differently.
+        exact_body = body.replace(b"1e-07", b"1e-7")
+        oversized = json.dumps(
+            {**IPN, "padding": "x" * NOWPAYMENTS_IPN_MAX_BYTES * 30}
+        ).encode()
+        cases = {
+            "valid IPN": (body, _sign(body)),
+            "valid, 1e-7": (exact_body, _sign(exact_body)),
+            "bad signature": (body, "0" * 128),
+            "unsigned": (body, ""),
+            "500KB body": (oversized, "0" * 128),
+        }
+
+        def parse_and_verify(body, signature):
+            return provider.verify_webhook_signature(json.loads(body), signature)
+
+        methods = {
+            "parse + verify_webhook_signature": parse_and_verify,
+            "verify_webhook_body": provider.verify_webhook_body,
+        }
+
+        self.stdout.write(f"{'case':<16} {'method':<34} {'calls/s':>12}")
+        for case, (case_body, signature) in cases.items():
+            number = options["number"]
+            if len(case_body) > NOWPAYMENTS_IPN_MAX_BYTES:
+                number = max(number // 100, 1)
+            best = dict.fromkeys(methods, float("inf"))
+            for _ in range(options["rounds"]):
+                for name, method in methods.items():
+                    duration = timeit.timeit(
+                        lambda: method(case_body, signature), number=number
+                    )
+                    best[name] = min(best[name], duration)
+            for name, duration in best.items():
+                self.stdout.write(f"{case:<16} {name:<34} {number / duration:>12,.0f}")
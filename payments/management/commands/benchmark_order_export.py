@@ -0,0 +1,83 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.export import get_export_rows, iter_csv, write_xlsx
+from payments.models import Order
+from products.models import PricingTier
+
+CREATE_BATCH_SIZE = 10000
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the order export and report its size and the peak memory use. "
+        "Run it against a scratch database when using --create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--create",
+            type=int,
+            default=0,
+            metavar="ROWS",
+            help="First add this many orders, for the first pricing tier.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "xlsx"),
+            default="csv",
+            help="The export format to time. Peak memory use is per process, "
+            "so time one format per run.",
+        )
+
+    def create_orders(self, count):
+        tier = PricingTier.objects.first()
+        if tier is None:
+            raise CommandError("Create a product with a pricing tier first.")
+        for start in range(0, count, CREATE_BATCH_SIZE):
+            Order.objects.bulk_create(
+                Order(
+                    product_id=tier.page_id,
+                    pricing_tier=tier,
+                    price_at_purchase=tier.price,
+                    full_name="Benchmark",
+                    email="benchmark@example.com",
+                )
+                for _ in range(min(CREATE_BATCH_SIZE, count - start))
+            )
+
+    def handle(self, *args, **options):
+        if options["create"]:
+            self.create_orders(options["create"])
+
+        rows = 0
+
+        def counted(export_rows):
+            nonlocal rows
+            for row in export_rows:
+                rows += 1
+                yield row
+
+        rss_before = _peak_rss_mb()
+        start = time.perf_counter()
+        if options["format"] == "xlsx":
+            with write_xlsx(counted(get_export_rows())) as output:
+                size = output.seek(0, 2)
+        else:
+            size = sum(
+                len(line.encode()) for line in iter_csv(counted(get_export_rows()))
+            )
+        duration = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{options['format'].upper()}: {rows} rows in {duration:.1f}s, "
+            f"{size / 1e6:.1f}MB; peak RSS {_peak_rss_mb():.0f}MB "
+            f"({rss_before:.0f}MB before the export)."
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from payments.http import get_endpoint_metrics
+from payments.payment_providers import FlutterwaveProvider
+from payments.providers import NowPaymentsProvider
+
+PROVIDERS = (NowPaymentsProvider, FlutterwaveProvider)
+
+
+class Command(BaseCommand):
+    help = "Show request counts, error rates and mean latency per provider endpoint."
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'endpoint':<24} {'requests':>9} {'errors':>7} {'error %':>8} "
+            f"{'mean ms':>8}"
+        )
+        for provider in PROVIDERS:
+            for endpoint in provider.endpoints:
+                metrics = get_endpoint_metrics(provider.name, endpoint)
+                count = metrics["requests"]
+                error_rate = 100 * metrics["errors"] / count if count else 0
+                mean = metrics["duration_ms"] / count if count else 0
+                self.stdout.write(
+                    f"{provider.name + ':' + endpoint:<24} {count:>9} "
+                    f"{metrics['errors']:>7} {error_rate:>8.1f} {mean:>8.0f}"
+                )
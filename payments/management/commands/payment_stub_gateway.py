@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from payments.stub_gateway import make_stub_gateway
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in for the payment gateways' APIs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8010)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Seconds to wait before answering each call.",
+        )
+        parser.add_argument(
+            "--failure-rate",
+            type=float,
+            default=0,
+            help="Fraction of calls (0-1) answered with a 503.",
+        )
+        parser.add_argument(
+            "--payment-status",
+            default="waiting",
+            help="The status reported for every NOWPayments payment.",
+        )
+
+    def handle(self, *args, **options):
+        server = make_stub_gateway(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"],
+            failure_rate=options["failure_rate"],
+            payment_status=options["payment_status"],
+            verbose=True,
+        )
+        url = f"http://{options['host']}:{server.server_port}"
+        self.stdout.write(
+            "Serving the stub gateway; point the providers at it with\n"
+            f'  NOWPAYMENTS_API_URL = "{url}/nowpayments/v1"\n'
+            f'  FLUTTERWAVE_API_URL = "{url}/flutterwave/v3"'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from payments.models import PaymentNotification
+from payments.notifications import process_pending_notifications, replay
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending payment notifications (IPNs) to their orders, optionally "
+        "replaying dead letters or specific notifications first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--replay",
+            type=int,
+            nargs="+",
+            metavar="ID",
+            default=[],
+            help="IDs of notifications to process again, whatever their status.",
+        )
+        parser.add_argument(
+            "--replay-dead",
+            action="store_true",
+            help="Process every dead-letter notification again.",
+        )
+
+    def handle(self, *args, **options):
+        replayed = 0
+        if options["replay"]:
+            replayed += replay(
+                PaymentNotification.objects.filter(pk__in=options["replay"])
+            )
+        if options["replay_dead"]:
+            replayed += replay(
+                PaymentNotification.objects.filter(
+                    status=PaymentNotification.Status.DEAD
+                )
+            )
+        processed = process_pending_notifications()
+        dead = PaymentNotification.objects.filter(
+            status=PaymentNotification.Status.DEAD
+        ).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Replayed {replayed} and applied {processed} notifications; "
+                f"{dead} in the dead letters."
+            )
+        )
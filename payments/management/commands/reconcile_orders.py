@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail.models import Site
+
+from payments.models import PaymentSettings
+from payments.providers import NowPaymentsProvider
+from payments.reconciliation import reconcile_pending_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Check pending orders against NOWPayments, settle the ones whose "
+        "payment has finished, failed or expired, and expire abandoned ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--expire-after",
+            type=float,
+            default=getattr(settings, "PAYMENT_ORDER_EXPIRY_HOURS", 24),
+            help="Hours after which an unpaid order expires (defaults to "
+            "PAYMENT_ORDER_EXPIRY_HOURS, or 24).",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=15,
+            help="Minutes an order must be old before it is checked.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of orders loaded and updated at a time.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Number of concurrent calls to the NOWPayments API.",
+        )
+        parser.add_argument(
+            "--site",
+            help="Hostname of the site whose payment settings to use "
+            "(defaults to the default site).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without changing anything.",
+        )
+
+    def handle(self, *args, **options):
+        if options["site"]:
+            site = Site.objects.filter(hostname=options["site"]).first()
+        else:
+            site = Site.objects.filter(is_default_site=True).first()
+        if site is None:
+            raise CommandError("No such site.")
+        payment_settings = PaymentSettings.for_site(site)
+        provider = NowPaymentsProvider(
+            api_key=payment_settings.nowpayments_api_key,
+            ipn_secret_key=payment_settings.nowpayments_ipn_secret_key,
+        )
+
+        result = reconcile_pending_orders(
+            provider,
+            expire_after=timedelta(hours=options["expire_after"]),
+            min_age=timedelta(minutes=options["min_age"]),
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            dry_run=options["dry_run"],
+        )
+
+        changed = ", ".join(
+            f"{count} {status}" for status, count in sorted(result.changed.items())
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Would settle' if options['dry_run'] else 'Settled'} "
+                f"{changed or 'no orders'} of {result.checked} pending orders "
+                f"({result.lookups} payment lookups, {result.lookup_errors} failed)."
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_paymentsettings_support_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='nowpayments_invoice_url',
+            field=models.URLField(blank=True, max_length=500, null=True),
+        ),
+    ]
@@ -1,6 +1,6 @@
 # payments/models.py
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
@@ -45,6 +45,8 @@ class Order(models.Model):
     
     # NOWPayments specific fields
     nowpayments_invoice_id = models.CharField(max_length=255, blank=True, null=True)
+    # Set by the background task that creates the invoice; see payments.tasks.
+    nowpayments_invoice_url = models.URLField(max_length=500, blank=True, null=True)
     nowpayments_payment_id = models.CharField(max_length=255, blank=True, null=True)
 
     # Status and Timestamps
@@ -61,6 +63,158 @@ class Order(models.Model):
     core_functionality = models.TextField(help_text="A summary of the project's main purpose and features.",null=True)
     brand_details = models.TextField(blank=True, help_text="Client notes on branding, colors, logos, etc.",null=True)
 
+    class Meta:
+        indexes = [
+            # The admin's status filter and the reconciliation job's scan of
+            # pending orders by age.
+            models.Index(fields=["status", "created_at"]),
+            # The admin's default ordering and date hierarchy.
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["email"]),
+            models.Index(fields=["nowpayments_invoice_id"]),
+        ]
+
+    # Target status -> the statuses it may be reached from. A completed payment
+    # wins over an expiry or failure reported before it; nothing leaves PAID.
+    TRANSITIONS = {
+        OrderStatus.PAID: (
+            OrderStatus.PENDING,
+            OrderStatus.EXPIRED,
+            OrderStatus.FAILED,
+        ),
+        OrderStatus.EXPIRED: (OrderStatus.PENDING,),
+        OrderStatus.FAILED: (OrderStatus.PENDING,),
+    }
+
+    def __str__(self):
+        return f"Order {self.order_id}"
+
+    def transition(self, status, source, notification=None, **fields):
+        """
+        Move the order to ``status`` if allowed from its current status.
+
+        Safe against concurrent callers without locks: the change is a single
+        ``UPDATE ... WHERE status = <status read>``, retried if another
+        worker changed the status in between, and it writes only ``status``
+        and ``fields``. Each change is recorded as an ``OrderTransition``.
+        Returns True if this call changed the status, False if the order
+        already was somewhere ``status`` cannot be reached from (including
+        ``status`` itself), which makes repeated notifications harmless.
+        """
+        allowed = self.TRANSITIONS.get(status, ())
+        orders = Order.objects.filter(pk=self.pk)
+        while True:
+            current = orders.values_list("status", flat=True).get()
+            if current not in allowed:
+                self.status = current
+                return False
+            with transaction.atomic():
+                if orders.filter(status=current).update(status=status, **fields):
+                    OrderTransition.objects.create(
+                        order=self,
+                        from_status=current,
+                        to_status=status,
+                        source=source,
+                        notification=notification,
+                    )
+                    break
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return True
+
+    @classmethod
+    def bulk_transition(cls, orders, status, source, fields=()):
+        """
+        Move many orders to ``status`` at once, e.g. from a reconciliation run.
+
+        ``orders`` carry the new values of ``fields``. The orders still in a
+        status ``status`` can be reached from are locked, updated with one
+        ``bulk_update`` and logged with one insert; the others are skipped.
+        Returns the orders changed.
+        """
+        allowed = cls.TRANSITIONS.get(status, ())
+        by_pk = {order.pk: order for order in orders}
+        with transaction.atomic():
+            current = dict(
+                cls.objects.select_for_update()
+                .filter(pk__in=by_pk, status__in=allowed)
+                .values_list("pk", "status")
+            )
+            changed = [by_pk[pk] for pk in current]
+            for order in changed:
+                order.status = status
+            cls.objects.bulk_update(changed, ["status", *fields])
+            OrderTransition.objects.bulk_create(
+                OrderTransition(
+                    order=order,
+                    from_status=current[order.pk],
+                    to_status=status,
+                    source=source,
+                )
+                for order in changed
+            )
+        return changed
+
+
+class PaymentNotification(models.Model):
+    """
+    An IPN received from NOWPayments, kept exactly as it arrived.
+
+    The webhook view only verifies and stores notifications; they are applied
+    to their orders in the background, oldest first per order, by
+    `payments.tasks.process_payment_notifications_task`. See
+    `payments.notifications`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        # Gave up after repeated errors, or cannot apply (e.g. unknown order);
+        # left for inspection and replay.
+        DEAD = "dead", "Dead letter"
+
+    provider = models.CharField(max_length=50, default="nowpayments")
+    order_id = models.CharField(max_length=36, db_index=True)
+    payment_status = models.CharField(max_length=50, blank=True)
+    body = models.BinaryField()
+    signature = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["received_at", "pk"]
+
+    def __str__(self):
+        return f"{self.payment_status or 'IPN'} for order {self.order_id}"
+
+
+class OrderTransition(models.Model):
+    """A status change of an order; rows are only ever added. See `Order.transition`."""
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="transitions"
+    )
+    from_status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    to_status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    # What made the change, e.g. "ipn" or "invoice".
+    source = models.CharField(max_length=50)
+    notification = models.ForeignKey(
+        PaymentNotification,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at", "pk"]
 
     def __str__(self):
-        return f"Order {self.order_id}"
\ No newline at end of file
+        return f"{self.order}: {self.from_status} -> {self.to_status}"
@@ -0,0 +1,186 @@
+"""
+The inbox of payment notifications (IPNs) from NOWPayments.
+
+NOWPayments sends several notifications per payment as its status moves on.
+The webhook view only verifies each one, stores it as a `PaymentNotification`
+and queues processing, so it can acknowledge at once however busy the site
+is. Processing applies the pending notifications of one order in the order
+they were received, holding a lock on the order row so concurrent workers
+never interleave them; the status changes themselves go through
+`Order.transition`, which is safe on its own.
+
+Processing only leaves the request with a real task queue, as in production
+(the database backend and ``manage.py db_worker``); with the immediate backend
+used in development it still runs inside the webhook request.
+
+A notification that fails is retried later, waiting twice as long after each
+attempt, where the task backend can defer tasks (the immediate backend cannot;
+``manage.py process_payment_notifications`` picks those up). One that keeps
+failing is moved to the dead letters after `MAX_ATTEMPTS`, as is one that
+cannot be applied at all; `replay` puts notifications back in the queue.
+"""
+
+import json
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, PaymentNotification
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+
+# Wait before the first retry; doubled after each further failed attempt.
+RETRY_DELAY = timedelta(seconds=30)
+
+
+class UnprocessableNotification(Exception):
+    """The notification can never be applied; retrying will not help."""
+
+
+def receive_notification(body, signature, payload):
+    """Store a verified notification and queue its order for processing."""
+    from .tasks import process_payment_notifications_task
+
+    notification = PaymentNotification.objects.create(
+        order_id=str(payload.get("order_id") or "")[:36],
+        payment_status=str(payload.get("payment_status") or "")[:50],
+        body=body,
+        signature=signature or "",
+    )
+    process_payment_notifications_task.enqueue(notification.order_id)
+    return notification
+
+
+def apply_notification(order, payload, notification=None):
+    """Move ``order`` on according to a notification's ``payment_status``."""
+    payment_status = payload.get("payment_status")
+    payment_id = payload.get("payment_id")
+
+    if payment_id and not order.nowpayments_payment_id:
+        # Known from the first notification ("waiting") on, and what the
+        # reconciliation job looks payments up by if later ones get lost.
+        Order.objects.filter(
+            pk=order.pk, nowpayments_payment_id__isnull=True
+        ).update(nowpayments_payment_id=payment_id)
+        order.nowpayments_payment_id = payment_id
+
+    if payment_status == "finished":
+        # TODO: Send "Payment Received" email to client and admin when this
+        # returns True, i.e. once per order
+        order.transition(
+            Order.OrderStatus.PAID,
+            source="ipn",
+            notification=notification,
+            nowpayments_payment_id=payload.get("payment_id"),
+            paid_at=timezone.now(),
+        )
+
+    elif payment_status in ["expired", "failed"]:
+        # TODO: Send "Payment Failed" email when this returns True
+        order.transition(
+            Order.OrderStatus.FAILED
+            if payment_status == "failed"
+            else Order.OrderStatus.EXPIRED,
+            source="ipn",
+            notification=notification,
+        )
+
+
+def _process(notification, order):
+    try:
+        if order is None:
+            raise UnprocessableNotification(
+                f"No order with order_id {notification.order_id!r}."
+            )
+        try:
+            payload = json.loads(bytes(notification.body))
+        except ValueError as e:
+            raise UnprocessableNotification(f"Invalid JSON: {e}") from e
+        with transaction.atomic():
+            apply_notification(order, payload, notification)
+    except UnprocessableNotification as e:
+        notification.status = PaymentNotification.Status.DEAD
+        notification.error = str(e)
+    except Exception as e:
+        logger.exception("Could not process %s", notification)
+        # Discard whatever the failed attempt changed on the order.
+        order.refresh_from_db()
+        notification.error = repr(e)
+        if notification.attempts + 1 >= MAX_ATTEMPTS:
+            notification.status = PaymentNotification.Status.DEAD
+    else:
+        notification.status = PaymentNotification.Status.PROCESSED
+        notification.error = ""
+        notification.processed_at = timezone.now()
+    notification.attempts += 1
+    notification.save(
+        update_fields=["status", "error", "attempts", "processed_at"]
+    )
+    return notification.status == PaymentNotification.Status.PROCESSED
+
+
+def _retry_later(notification):
+    """Queue the notification's order again once its backoff has passed."""
+    from .tasks import process_payment_notifications_task
+
+    if not process_payment_notifications_task.get_backend().supports_defer:
+        return
+    delay = RETRY_DELAY * 2 ** (notification.attempts - 1)
+    process_payment_notifications_task.using(
+        run_after=timezone.now() + delay
+    ).enqueue(notification.order_id)
+
+
+def process_order_notifications(order_id):
+    """
+    Apply the pending notifications of one order, oldest first.
+
+    Stops at the first notification that fails but may succeed on a retry,
+    so later ones are never applied ahead of it, and queues that retry.
+    Returns the number applied.
+    """
+    processed = 0
+    failed = None
+    with transaction.atomic():
+        # The lock on the order serializes workers handling the same order.
+        order = Order.objects.select_for_update().filter(order_id=order_id).first()
+        pending = PaymentNotification.objects.select_for_update().filter(
+            order_id=order_id, status=PaymentNotification.Status.PENDING
+        )
+        for notification in pending.order_by("received_at", "pk"):
+            if _process(notification, order):
+                processed += 1
+            elif notification.status == PaymentNotification.Status.PENDING:
+                failed = notification
+                break
+    if failed is not None:
+        _retry_later(failed)
+    return processed
+
+
+def process_pending_notifications():
+    """Process every order with pending notifications; returns the number applied."""
+    order_ids = (
+        PaymentNotification.objects.filter(status=PaymentNotification.Status.PENDING)
+        .values_list("order_id", flat=True)
+        .distinct()
+    )
+    return sum(process_order_notifications(order_id) for order_id in order_ids)
+
+
+def replay(notifications):
+    """Queue ``notifications`` (a queryset) again, e.g. dead letters after a fix."""
+    from .tasks import process_payment_notifications_task
+
+    notifications = notifications.exclude(status=PaymentNotification.Status.PENDING)
+    order_ids = set(notifications.values_list("order_id", flat=True))
+    count = notifications.update(
+        status=PaymentNotification.Status.PENDING, attempts=0, error=""
+    )
+    for order_id in order_ids:
+        process_payment_notifications_task.enqueue(order_id)
+    return count
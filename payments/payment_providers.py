@@ -1,8 +1,10 @@
 
 from abc import ABC, abstractmethod
-import requests
+from django.conf import settings
 from django.urls import reverse
 
+from .http import get_client
+
 
 class AbstractPaymentProvider(ABC):
     @abstractmethod
@@ -15,10 +17,17 @@ class AbstractPaymentProvider(ABC):
 
 
 class FlutterwaveProvider(AbstractPaymentProvider):
+    name = "flutterwave"
+    # Names of the API calls made, as recorded in metrics.
+    endpoints = ("payments", "verify")
+
     def __init__(self, public_key, secret_key):
         self.public_key = public_key
         self.secret_key = secret_key
-        self.base_url = "https://api.flutterwave.com/v3"
+        self.base_url = getattr(
+            settings, "FLUTTERWAVE_API_URL", "https://api.flutterwave.com/v3"
+        )
+        self.client = get_client(self.name, self.base_url)
 
     def initiate_payment(self, order, request):
         headers = {"Authorization": f"Bearer {self.secret_key}"}
@@ -34,17 +43,17 @@ class FlutterwaveProvider(AbstractPaymentProvider):
             "customizations": {"title": f"{order.product.title}"},
         }
 
-        response = requests.post(
-            f"{self.base_url}/payments", json=payload, headers=headers
+        response = self.client.post(
+            "/payments", "payments", json=payload, headers=headers
         )
         response.raise_for_status()
         return response.json()["data"]["link"]
 
     def verify_payment(self, transaction_id):
         headers = {"Authorization": f"Bearer {self.secret_key}"}
-        url = f"{self.base_url}/transactions/{transaction_id}/verify"
+        path = f"/transactions/{transaction_id}/verify"
 
-        response = requests.get(url, headers=headers)
+        response = self.client.get(path, "verify", headers=headers)
         response.raise_for_status()
         res_json = response.json()
 
@@ -2,10 +2,104 @@
 import json
 import hmac
 import hashlib
-import requests
+import re
 from abc import ABC, abstractmethod
+from json.encoder import encode_basestring_ascii
+from urllib.parse import urljoin
+from django.conf import settings
 from django.urls import reverse
 
+from .http import get_client
+
+# IPN bodies are a few hundred bytes; anything much larger is not NOWPayments.
+NOWPAYMENTS_IPN_MAX_BYTES = getattr(settings, "NOWPAYMENTS_IPN_MAX_BYTES", 16 * 1024)
+
+# A hex HMAC-SHA512 digest.
+SIGNATURE_RE = re.compile(r"[0-9a-fA-F]{128}")
+
+_JSON_CONSTANTS = {True: "true", False: "false", None: "null"}
+
+
+class _JSONNumber(float):
+    """A JSON number with a fraction or exponent, remembering how it was written."""
+
+    def __new__(cls, text):
+        number = super().__new__(cls, text)
+        number.text = text
+        return number
+
+
+def _canonical(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ",".join(
+                encode_basestring_ascii(key) + ":" + _canonical(item)
+                for key, item in sorted(value.items())
+            )
+            + "}"
+        )
+    if isinstance(value, list):
+        return "[" + ",".join(map(_canonical, value)) + "]"
+    if isinstance(value, _JSONNumber):
+        return value.text
+    if isinstance(value, bool) or value is None:
+        return _JSON_CONSTANTS[value]
+    return str(value)
+
+
+class _RewrittenNumber(Exception):
+    pass
+
+
+def _parse_plain_float(text):
+    number = float(text)
+    if repr(number) != text:
+        raise _RewrittenNumber
+    return number
+
+
+# Built once; ``json.loads`` and ``json.dumps`` build one per call when given
+# options.
+_PLAIN_DECODER = json.JSONDecoder(parse_float=_parse_plain_float)
+_EXACT_DECODER = json.JSONDecoder(parse_float=_JSONNumber)
+_CANONICAL_ENCODER = json.JSONEncoder(separators=(",", ":"), sort_keys=True)
+
+
+def _parse_json(body):
+    """
+    Parse ``body``, and say whether ``json.dumps`` writes its numbers as sent.
+
+    If it would not for some number (e.g. ``1e-7``, ``155.10``), the body is
+    parsed again with every fraction or exponent number as a ``_JSONNumber``.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode(json.detect_encoding(body))
+    try:
+        return _PLAIN_DECODER.decode(body), True
+    except _RewrittenNumber:
+        return _EXACT_DECODER.decode(body), False
+
+
+def _encode_canonical(value, plain):
+    if plain:
+        # The C encoder; only the rare body with numbers it would rewrite
+        # needs the pure Python one.
+        return _CANONICAL_ENCODER.encode(value).encode()
+    return _canonical(value).encode()
+
+
+def canonical_json(body):
+    """
+    ``body``, a JSON document, with sorted keys and no whitespace.
+
+    Unlike ``json.dumps`` on the parsed value, numbers keep the text they
+    were sent as (e.g. ``1e-7`` rather than ``1e-07``).
+    """
+    return _encode_canonical(*_parse_json(body))
+
 
 class AbstractPaymentProvider(ABC):
     @abstractmethod
@@ -14,27 +108,34 @@ class AbstractPaymentProvider(ABC):
 
 
 class NowPaymentsProvider(AbstractPaymentProvider):
+    name = "nowpayments"
+    # Names of the API calls made, as recorded in metrics.
+    endpoints = ("invoice", "payment-status")
+
     def __init__(self, api_key, ipn_secret_key):
         self.api_key = api_key
         self.ipn_secret_key = ipn_secret_key
-        self.base_url = "https://api.nowpayments.io/v1"
+        self.base_url = getattr(
+            settings, "NOWPAYMENTS_API_URL", "https://api.nowpayments.io/v1"
+        )
 
     def initiate_payment(self, order, request):
+        return self.create_invoice(order, request.build_absolute_uri("/"))
+
+    def create_invoice(self, order, site_url):
         """
         Implements the "Create Invoice" flow from the NOWPayments documentation.
+
+        ``site_url`` is the root URL of the site the order was placed on, which
+        the callback and redirect URLs are built from. Runs outside the request
+        cycle (see payments.tasks), so it must not need a request.
         """
         headers = {"x-api-key": self.api_key, "Content-Type": "application/json"}
 
         # Build the URLs for callbacks and redirects
-        ipn_callback_url = request.build_absolute_uri(
-            reverse("payments:nowpayments_webhook")
-        )
-        success_url = request.build_absolute_uri(
-            reverse("payments:payment_success")
-        )  # We will create this URL
-        cancel_url = request.build_absolute_uri(
-            reverse("payments:payment_failure")
-        )  # We will create this URL
+        ipn_callback_url = urljoin(site_url, reverse("payments:nowpayments_webhook"))
+        success_url = urljoin(site_url, reverse("payments:payment_success"))
+        cancel_url = urljoin(site_url, reverse("payments:payment_failure"))
 
         payload = {
             "price_amount": float(order.price_at_purchase),
@@ -46,24 +147,81 @@ class NowPaymentsProvider(AbstractPaymentProvider):
             "cancel_url": cancel_url,
         }
 
-        response = requests.post(
-            f"{self.base_url}/invoice", json=payload, headers=headers
-        )
+        client = get_client(self.name, self.base_url)
+        response = client.post("/invoice", "invoice", json=payload, headers=headers)
         response.raise_for_status()  # Will raise an error for non-2xx responses
 
         data = response.json()
 
-        # Save the invoice ID to our order for tracking
+        # Save the invoice ID to our order for tracking, and the URL for the
+        # customer to pay at
         order.nowpayments_invoice_id = data.get("id")
-        order.save()
+        order.nowpayments_invoice_url = data.get("invoice_url")
+        order.save(update_fields=["nowpayments_invoice_id", "nowpayments_invoice_url"])
+
+        return order.nowpayments_invoice_url
 
-        # Return the URL for the user to pay
-        return data.get("invoice_url")
+    def get_payment_status(self, payment_id):
+        """The ``payment_status`` NOWPayments reports for a payment."""
+        headers = {"x-api-key": self.api_key}
+        client = get_client(self.name, self.base_url)
+        response = client.get(
+            f"/payment/{payment_id}", "payment-status", headers=headers
+        )
+        response.raise_for_status()
+        return response.json().get("payment_status")
+
+    def verify_webhook_body(self, body, signature_header):
+        """
+        Verifies the HMAC-SHA512 signature of a webhook's raw request body.
+
+        NOWPayments signs the body re-encoded with sorted keys, with numbers
+        as they were sent (see ``canonical_json``). The body is re-encoded
+        with the C JSON encoder first, which writes nearly every number the
+        same way; bodies with a number it rewrites are checked again with the
+        exact encoding. Returns the parsed payload if the signature matches
+        and None if it does not. Bodies that are unsigned, oversized
+        or signed with something that is not a SHA-512 hex digest are
+        rejected before being parsed. Raises ``ValueError`` if the body is not
+        a JSON object.
+        """
+        if (
+            not self.ipn_secret_key
+            or not signature_header
+            or not SIGNATURE_RE.fullmatch(signature_header)
+            or len(body) > NOWPAYMENTS_IPN_MAX_BYTES
+        ):
+            return None
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object.")
+        message = _encode_canonical(payload, plain=True)
+        if self._signature_matches(message, signature_header):
+            return payload
+        # json.dumps may write a number differently from how it was sent and
+        # signed (e.g. 1e-07 for 1e-7); only such bodies get a second check.
+        exact_payload, plain = _parse_json(body)
+        if not plain and self._signature_matches(
+            _encode_canonical(exact_payload, plain), signature_header
+        ):
+            return payload
+        return None
+
+    def _signature_matches(self, message, signature_header):
+        expected_signature = hmac.new(
+            key=self.ipn_secret_key.encode(),
+            msg=message,
+            digestmod=hashlib.sha512,
+        ).hexdigest()
+        return hmac.compare_digest(expected_signature, signature_header.lower())
 
     def verify_webhook_signature(self, request_body, signature_header):
         """
         Verifies the HMAC-SHA512 signature from the webhook request.
         This is a critical security measure.
+
+        ``request_body`` is the parsed payload; the webhook view uses
+        ``verify_webhook_body`` on the raw body instead.
         """
         try:
             # Recreate the signature from the payload
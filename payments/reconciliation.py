@@ -0,0 +1,152 @@
+"""
+Reconciliation of pending orders with NOWPayments.
+
+An order stays pending until an IPN moves it on, so a lost IPN would leave
+it pending for good, and abandoned checkouts would never expire.
+`reconcile_pending_orders` walks the pending orders oldest first, in keyset
+pages of `batch_size` so memory use stays flat however many there are. For
+each page it asks NOWPayments for the status of every order whose payment it
+knows, a bounded number of calls at a time over the pooled provider client,
+and applies the resulting transitions in bulk (see `Order.bulk_transition`).
+
+Orders whose payment is unknown to us or still waiting for the customer once
+they are older than `expire_after` are expired. That is not final: a
+"finished" IPN arriving later still marks the order paid. Payments the
+gateway is still processing ("confirming", "partially_paid", ...) may yet
+finish, so their orders stay pending however old they are.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# NOWPayments payment_status -> the order status it settles on.
+SETTLED_STATUSES = {
+    "finished": Order.OrderStatus.PAID,
+    "failed": Order.OrderStatus.FAILED,
+    "expired": Order.OrderStatus.EXPIRED,
+}
+
+# NOWPayments payment_status values of payments nobody has paid into yet.
+UNPAID_STATUSES = {"waiting"}
+
+RECONCILE_FIELDS = ("created_at", "status", "order_id", "nowpayments_payment_id")
+
+
+@dataclass
+class ReconciliationResult:
+    checked: int = 0
+    lookups: int = 0
+    lookup_errors: int = 0
+    changed: dict = field(default_factory=dict)
+
+    def count(self, status, orders):
+        self.changed[status] = self.changed.get(status, 0) + len(orders)
+
+
+def iter_pending_batches(created_before, batch_size):
+    """Pending orders created before ``created_before``, oldest first, in pages."""
+    orders = (
+        Order.objects.filter(
+            status=Order.OrderStatus.PENDING, created_at__lt=created_before
+        )
+        .only(*RECONCILE_FIELDS)
+        .order_by("created_at", "pk")
+    )
+    last = None
+    while True:
+        page = orders
+        if last is not None:
+            page = page.filter(
+                Q(created_at__gt=last.created_at)
+                | Q(created_at=last.created_at, pk__gt=last.pk)
+            )
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def _lookup(provider, order):
+    try:
+        return order, provider.get_payment_status(order.nowpayments_payment_id), None
+    except (requests.RequestException, ValueError) as e:
+        return order, None, e
+
+
+def reconcile_batch(provider, batch, expire_before, executor, result, dry_run):
+    """Settle one page of pending orders; see the module docstring."""
+    now = timezone.now()
+    targets = {status: [] for status in Order.TRANSITIONS}
+    # Orders not to expire: settled or in progress at the provider, or not
+    # looked up.
+    keep = set()
+    known = [order for order in batch if order.nowpayments_payment_id]
+    for order, payment_status, error in executor.map(
+        lambda order: _lookup(provider, order), known
+    ):
+        result.lookups += 1
+        if error is not None:
+            result.lookup_errors += 1
+            logger.warning("Could not look up the payment of %s: %s", order, error)
+            # Leave it pending rather than expire an order that may be paid.
+            keep.add(order.pk)
+            continue
+        status = SETTLED_STATUSES.get(payment_status)
+        if status is not None:
+            if status == Order.OrderStatus.PAID:
+                order.paid_at = now
+            targets[status].append(order)
+            keep.add(order.pk)
+        elif payment_status not in UNPAID_STATUSES:
+            keep.add(order.pk)
+
+    targets[Order.OrderStatus.EXPIRED].extend(
+        order
+        for order in batch
+        if order.pk not in keep and order.created_at < expire_before
+    )
+
+    result.checked += len(batch)
+    for status, orders in targets.items():
+        if not orders:
+            continue
+        if not dry_run:
+            fields = ("paid_at",) if status == Order.OrderStatus.PAID else ()
+            orders = Order.bulk_transition(
+                orders, status, source="reconcile", fields=fields
+            )
+        result.count(status, orders)
+
+
+def reconcile_pending_orders(
+    provider,
+    expire_after,
+    min_age,
+    batch_size=200,
+    concurrency=8,
+    dry_run=False,
+):
+    """
+    Reconcile every pending order older than ``min_age`` (a timedelta).
+
+    ``min_age`` keeps the job off orders whose checkout is still under way.
+    Returns a `ReconciliationResult`.
+    """
+    now = timezone.now()
+    result = ReconciliationResult()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch in iter_pending_batches(now - min_age, batch_size):
+            reconcile_batch(
+                provider, batch, now - expire_after, executor, result, dry_run
+            )
+    return result
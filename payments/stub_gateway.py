@@ -0,0 +1,149 @@
+"""
+A local stand-in for the payment gateways' APIs, for development and tests.
+
+It answers the calls the providers make, at ``/nowpayments/v1/...`` and
+``/flutterwave/v3/...``, with canned successful responses, optionally slowed
+down or failing with 503s to exercise timeouts, retries and the circuit
+breaker. Point the providers at it with e.g.::
+
+    NOWPAYMENTS_API_URL = "http://127.0.0.1:8010/nowpayments/v1"
+    FLUTTERWAVE_API_URL = "http://127.0.0.1:8010/flutterwave/v3"
+
+Run it with the ``payment_stub_gateway`` command, or in a thread from a test
+with ``start_stub_gateway``.
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERIFY_PATH = re.compile(r"^/flutterwave/v3/transactions/(?P<id>[^/]+)/verify$")
+PAYMENT_PATH = re.compile(r"^/nowpayments/v1/payment/(?P<id>[^/]+)$")
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Apply the configured latency; True if this call should fail."""
+        self.server.request_count += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.failure_rate:
+            self._send_json(503, {"message": "Service unavailable (stub)"})
+            return True
+        return False
+
+    def do_POST(self):
+        if self._simulate():
+            return
+        payload = self._read_json()
+        host = f"http://{self.headers.get('Host')}"
+        if self.path == "/nowpayments/v1/invoice":
+            invoice_id = str(uuid.uuid4().int)[:10]
+            self._send_json(
+                200,
+                {
+                    "id": invoice_id,
+                    "order_id": payload.get("order_id"),
+                    "price_amount": str(payload.get("price_amount")),
+                    "invoice_url": f"{host}/nowpayments/invoice/{invoice_id}",
+                },
+            )
+        elif self.path == "/flutterwave/v3/payments":
+            self._send_json(
+                200,
+                {
+                    "status": "success",
+                    "data": {
+                        "link": f"{host}/flutterwave/pay/{payload.get('tx_ref')}"
+                    },
+                },
+            )
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+    def do_GET(self):
+        if self._simulate():
+            return
+        match = PAYMENT_PATH.match(self.path)
+        if match:
+            self._send_json(
+                200,
+                {
+                    "payment_id": match["id"],
+                    "payment_status": self.server.payment_statuses.get(
+                        match["id"], self.server.payment_status
+                    ),
+                },
+            )
+            return
+        match = VERIFY_PATH.match(self.path)
+        if match:
+            self._send_json(
+                200,
+                {
+                    "status": "success",
+                    "data": {"id": match["id"], "status": "successful"},
+                },
+            )
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubGatewayServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up before the (slow) response is sent.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_stub_gateway(
+    host="127.0.0.1",
+    port=0,
+    latency=0,
+    failure_rate=0,
+    payment_status="waiting",
+    verbose=False,
+):
+    """
+    Create the server; ``port=0`` picks a free port (see ``server_port``).
+
+    NOWPayments payments report ``payment_status``, unless overridden per
+    payment ID in the server's ``payment_statuses`` dict. ``request_count``
+    counts the calls the server has received.
+    """
+    server = StubGatewayServer((host, port), StubGatewayHandler)
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.payment_status = payment_status
+    server.payment_statuses = {}
+    server.request_count = 0
+    server.verbose = verbose
+    return server
+
+
+def start_stub_gateway(**kwargs):
+    """Serve a stub gateway from a daemon thread; call ``shutdown()`` when done."""
+    server = make_stub_gateway(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,52 @@
+import logging
+
+from django_tasks import task
+from wagtail.models import Site
+
+from payments.models import Order, PaymentSettings
+from payments.notifications import process_order_notifications
+from payments.providers import NowPaymentsProvider
+
+logger = logging.getLogger(__name__)
+
+
+@task()
+def create_invoice_task(order_id, site_id, site_url):
+    """
+    Create the NOWPayments invoice for a new order.
+
+    Runs in the background so a slow gateway never holds up a web worker; the
+    customer waits on the order status page until ``nowpayments_invoice_url``
+    is set, or the order is marked failed.
+    """
+    order = (
+        Order.objects.select_related("product", "pricing_tier")
+        .filter(
+            pk=order_id,
+            status=Order.OrderStatus.PENDING,
+            nowpayments_invoice_url__isnull=True,
+        )
+        .first()
+    )
+    if order is None:
+        return None
+
+    # Any failure (gateway, bad response, missing site or settings) must end
+    # the customer's wait on the status page rather than leave it pending.
+    try:
+        payment_settings = PaymentSettings.for_site(Site.objects.get(pk=site_id))
+        provider = NowPaymentsProvider(
+            api_key=payment_settings.nowpayments_api_key,
+            ipn_secret_key=payment_settings.nowpayments_ipn_secret_key,
+        )
+        return provider.create_invoice(order, site_url)
+    except Exception:
+        logger.exception("Could not create an invoice for %s", order)
+        order.transition(Order.OrderStatus.FAILED, source="invoice")
+        return None
+
+
+@task()
+def process_payment_notifications_task(order_id):
+    """Apply an order's pending IPNs; see payments.notifications."""
+    return process_order_notifications(order_id)
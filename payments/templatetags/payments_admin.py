@@ -0,0 +1,120 @@
+"""
+A date hierarchy for large admin change lists.
+
+Django's ``{% date_hierarchy %}`` lists the years, months or days that have
+rows with a ``SELECT DISTINCT`` over the whole filtered table. This version
+offers every period between the first and last row instead, which needs only
+the ``MIN`` and ``MAX`` of the field, two index lookups whatever the table
+size. A period without rows simply shows an empty list.
+"""
+
+import datetime
+
+from django import template
+from django.db import models
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+
+register = template.Library()
+
+
+def _local_date(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _months(first, last):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = (month + datetime.timedelta(days=31)).replace(day=1)
+
+
+def _days(first, last):
+    for offset in range((last - first).days + 1):
+        yield first + datetime.timedelta(days=offset)
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def indexed_date_hierarchy(cl):
+    if not cl.date_hierarchy:
+        return {}
+    field_name = cl.date_hierarchy
+    year_field = f"{field_name}__year"
+    month_field = f"{field_name}__month"
+    day_field = f"{field_name}__day"
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [
+                {"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}
+            ],
+        }
+
+    # The change list is already filtered to the selected year or month.
+    bounds = cl.queryset.aggregate(
+        first=models.Min(field_name), last=models.Max(field_name)
+    )
+    if bounds["first"] is None:
+        first = last = None
+    else:
+        first, last = _local_date(bounds["first"]), _local_date(bounds["last"])
+        # Start at the deepest level that has a choice to make, like Django.
+        if not year_lookup and first.year == last.year:
+            year_lookup = str(first.year)
+            if first.month == last.month:
+                month_lookup = str(first.month)
+
+    if year_lookup and month_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": year_lookup},
+            "choices": [
+                {
+                    "link": link(
+                        {
+                            year_field: year_lookup,
+                            month_field: month_lookup,
+                            day_field: day.day,
+                        }
+                    ),
+                    "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")),
+                }
+                for day in (_days(first, last) if first else ())
+            ],
+        }
+    if year_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": "All dates"},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in (_months(first, last) if first else ())
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [
+            {"link": link({year_field: str(year)}), "title": str(year)}
+            for year in (range(first.year, last.year + 1) if first else ())
+        ],
+    }
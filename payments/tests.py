@@ -1,3 +1,649 @@
-from django.test import TestCase
+import csv
+import datetime
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from openpyxl import load_workbook
+from wagtail.models import Site
+
+from payments import http
+from payments.export import EXPORT_COLUMNS, get_export_rows, iter_csv, write_xlsx
+from payments.http import CircuitOpenError, ProviderClient, get_endpoint_metrics
+from payments.models import (
+    Order,
+    OrderTransition,
+    PaymentNotification,
+    PaymentSettings,
+)
+from payments.providers import (
+    NOWPAYMENTS_IPN_MAX_BYTES,
+    NowPaymentsProvider,
+    canonical_json,
+)
+from payments.reconciliation import reconcile_pending_orders
+from payments.stub_gateway import start_stub_gateway
+from payments.tasks import create_invoice_task, process_payment_notifications_task
+from products.models import PricingTier, ProductPage
+
+
+class StubGatewayMixin:
+    """Runs a stub gateway for the test case and points NOWPayments at it."""
+
+    gateway_options = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gateway = start_stub_gateway(**cls.gateway_options)
+        cls.gateway_url = "http://127.0.0.1:%d" % cls.gateway.server_port
+        cls.gateway_settings = override_settings(
+            NOWPAYMENTS_API_URL=f"{cls.gateway_url}/nowpayments/v1"
+        )
+        cls.gateway_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.gateway_settings.disable()
+        cls.gateway.shutdown()
+        cls.gateway.server_close()
+
+    def setUp(self):
+        super().setUp()
+        # Fresh clients, so no circuit breaker state leaks between tests.
+        http._clients.clear()
+        cache.clear()
+
+
+class ProviderClientTests(StubGatewayMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.gateway.latency = 0
+        self.gateway.failure_rate = 0
+        self.gateway.request_count = 0
+        self.provider = ProviderClient("stub", f"{self.gateway_url}/nowpayments/v1")
+
+    def test_get_is_retried_on_unavailable(self):
+        self.gateway.failure_rate = 1
+        with mock.patch("urllib3.util.Retry.sleep"):
+            response = self.provider.get("/payment/1", "payment")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.gateway.request_count, http.PROVIDER_RETRIES + 1)
+
+    def test_post_is_not_retried_once_sent(self):
+        self.gateway.failure_rate = 1
+        response = self.provider.post("/invoice", "invoice", json={})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.gateway.request_count, 1)
+
+    def test_slow_gateway_times_out(self):
+        self.gateway.latency = 0.5
+        with mock.patch.object(http, "PROVIDER_TIMEOUT", (1, 0.1)):
+            with self.assertRaises(requests.Timeout), self.assertLogs(
+                "payments.http", "WARNING"
+            ):
+                self.provider.post("/invoice", "invoice", json={})
+
+        self.assertEqual(self.provider.breaker.failures, 1)
+        self.assertEqual(
+            get_endpoint_metrics("stub", "invoice"),
+            {"requests": 1, "errors": 1, "duration_ms": mock.ANY},
+        )
+
+    def test_circuit_opens_after_repeated_failures(self):
+        self.gateway.failure_rate = 1
+        for _ in range(http.CIRCUIT_FAILURE_THRESHOLD):
+            self.provider.post("/invoice", "invoice", json={})
+
+        with self.assertRaises(CircuitOpenError):
+            self.provider.post("/invoice", "invoice", json={})
+        self.assertEqual(
+            self.gateway.request_count, http.CIRCUIT_FAILURE_THRESHOLD
+        )
+
+    def test_circuit_closes_after_successful_trial(self):
+        self.gateway.failure_rate = 1
+        for _ in range(http.CIRCUIT_FAILURE_THRESHOLD):
+            self.provider.post("/invoice", "invoice", json={})
+
+        self.gateway.failure_rate = 0
+        self.provider.breaker.opened_at -= http.CIRCUIT_RESET_TIMEOUT
+        response = self.provider.post("/invoice", "invoice", json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.provider.breaker.opened_at)
+        self.assertEqual(self.provider.breaker.failures, 0)
+
+
+class OrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.get(is_default_site=True)
+        cls.product = cls.site.root_page.add_child(
+            instance=ProductPage(title="App", slug="app")
+        )
+        cls.tier = PricingTier.objects.create(
+            page=cls.product, name="Basic", price=Decimal("100.00")
+        )
+        PaymentSettings.objects.create(
+            site=cls.site,
+            nowpayments_api_key="api-key",
+            nowpayments_ipn_secret_key="ipn-secret",
+        )
+
+    def create_order(self, **fields):
+        return Order.objects.create(
+            product=self.product,
+            pricing_tier=self.tier,
+            price_at_purchase=self.tier.price,
+            full_name="Ann Example",
+            email="ann@example.com",
+            **fields,
+        )
+
+
+class CreateInvoiceTaskTests(StubGatewayMixin, OrderTestCase):
+    def test_sets_invoice_url(self):
+        order = self.create_order()
+        url = create_invoice_task.call(order.pk, self.site.pk, "http://testserver/")
+
+        order.refresh_from_db()
+        self.assertEqual(order.nowpayments_invoice_url, url)
+        self.assertTrue(url.startswith(self.gateway_url))
+        self.assertEqual(order.status, Order.OrderStatus.PENDING)
+
+    def test_unexpected_error_fails_order(self):
+        order = self.create_order()
+        with mock.patch(
+            "payments.tasks.NowPaymentsProvider.create_invoice",
+            side_effect=KeyError("id"),
+        ), self.assertLogs("payments.tasks", "ERROR"):
+            create_invoice_task.call(order.pk, self.site.pk, "http://testserver/")
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.FAILED)
+
+    def test_missing_site_fails_order(self):
+        order = self.create_order()
+        with self.assertLogs("payments.tasks", "ERROR"):
+            create_invoice_task.call(order.pk, None, "http://testserver/")
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.FAILED)
+
+
+class CreateOrderViewTests(StubGatewayMixin, OrderTestCase):
+    def post_order(self):
+        # Tasks are enqueued when the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("products:create_order", args=[self.product.pk, self.tier.pk]),
+                {
+                    "full_name": "Ann Example",
+                    "email": "ann@example.com",
+                    "project_name": "Shop",
+                    "platform_choice": "web",
+                    "core_functionality": "Sell things.",
+                },
+            )
+
+    def test_creates_order_and_invoice(self):
+        response = self.post_order()
+        order = Order.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("payments:order_status", args=[order.order_id]),
+            fetch_redirect_response=False,
+        )
+        self.assertIsNotNone(order.nowpayments_invoice_url)
+
+    def test_request_without_site_fails_order(self):
+        with mock.patch(
+            "products.views.get_site_for_request", return_value=None
+        ), self.assertLogs("payments.tasks", "ERROR"):
+            response = self.post_order()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get().status, Order.OrderStatus.FAILED)
+
+
+class OrderTransitionTests(OrderTestCase):
+    def test_concurrent_transitions_change_the_status_once(self):
+        order = self.create_order()
+        other = Order.objects.get(pk=order.pk)
+        raced = False
+
+        def atomic(*args, **kwargs):
+            nonlocal raced
+            if not raced:
+                raced = True
+                # Another worker moves the order between this read and the update.
+                self.assertTrue(other.transition(Order.OrderStatus.PAID, source="ipn"))
+            return transaction.atomic(*args, **kwargs)
+
+        with mock.patch("payments.models.transaction", atomic=atomic):
+            changed = order.transition(Order.OrderStatus.PAID, source="ipn")
+
+        self.assertTrue(raced)
+        self.assertFalse(changed)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.PAID)
+        self.assertEqual(
+            list(order.transitions.values_list("from_status", "to_status")),
+            [(Order.OrderStatus.PENDING, Order.OrderStatus.PAID)],
+        )
+
+
+class NowPaymentsWebhookTests(OrderTestCase):
+    def post_notification(self, payload, secret="ipn-secret"):
+        body = json.dumps(payload)
+        message = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        signature = hmac.new(
+            secret.encode(), message.encode(), hashlib.sha512
+        ).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("payments:nowpayments_webhook"),
+                body,
+                content_type="application/json",
+                headers={"x-nowpayments-sig": signature},
+            )
+
+    def test_notification_is_stored_and_applied_in_the_background(self):
+        order = self.create_order()
+        payload = {
+            "order_id": str(order.order_id),
+            "payment_id": 5077125051,
+            "payment_status": "finished",
+        }
+        # A queue backend, as in production: the webhook only enqueues.
+        with mock.patch(
+            "payments.tasks.process_payment_notifications_task"
+        ) as queued_task:
+            response = self.post_notification(payload)
+
+        self.assertEqual(response.status_code, 200)
+        notification = PaymentNotification.objects.get()
+        self.assertEqual(notification.status, PaymentNotification.Status.PENDING)
+        queued_task.enqueue.assert_called_once_with(str(order.order_id))
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.PENDING)
+
+        # The worker then applies it.
+        process_payment_notifications_task.call(str(order.order_id))
+        order.refresh_from_db()
+        notification.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.PAID)
+        self.assertEqual(notification.status, PaymentNotification.Status.PROCESSED)
+
+    def test_failed_attempt_is_retried_with_backoff(self):
+        order = self.create_order()
+        PaymentNotification.objects.create(
+            order_id=str(order.order_id),
+            payment_status="finished",
+            body=json.dumps(
+                {"order_id": str(order.order_id), "payment_status": "finished"}
+            ).encode(),
+        )
+
+        with (
+            mock.patch(
+                "payments.notifications.apply_notification",
+                side_effect=ConnectionError("database went away"),
+            ),
+            mock.patch(
+                "payments.tasks.process_payment_notifications_task"
+            ) as queued_task,
+            self.assertLogs("payments.notifications", "ERROR"),
+        ):
+            process_payment_notifications_task.call(str(order.order_id))
+            notification = PaymentNotification.objects.get()
+            self.assertEqual(notification.status, PaymentNotification.Status.PENDING)
+            self.assertEqual(notification.attempts, 1)
+            run_after = queued_task.using.call_args.kwargs["run_after"]
+            self.assertAlmostEqual(
+                run_after,
+                timezone.now() + timedelta(seconds=30),
+                delta=timedelta(seconds=5),
+            )
+            queued_task.using.return_value.enqueue.assert_called_once_with(
+                str(order.order_id)
+            )
+
+        # The queued retry then applies it.
+        process_payment_notifications_task.call(str(order.order_id))
+        notification.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(notification.status, PaymentNotification.Status.PROCESSED)
+        self.assertEqual(notification.attempts, 2)
+        self.assertEqual(order.status, Order.OrderStatus.PAID)
+
+    def test_bad_signature_is_not_stored(self):
+        order = self.create_order()
+        payload = {"order_id": str(order.order_id), "payment_status": "finished"}
+        response = self.post_notification(payload, secret="wrong")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentNotification.objects.exists())
+
+
+class ReconcileTestCase(StubGatewayMixin, OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gateway.failure_rate = 0
+        self.gateway.payment_statuses = {}
+        self.provider = NowPaymentsProvider(api_key="api-key", ipn_secret_key="")
+
+    def create_order(self, age=timedelta(days=2), **fields):
+        order = super().create_order(**fields)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - age)
+        return order
+
+    def create_orders(self, payment_statuses, **fields):
+        """One order per ``payment_statuses`` entry, its payment reporting that."""
+        orders = []
+        for payment_status in payment_statuses:
+            payment_id = str(len(self.gateway.payment_statuses) + 1)
+            self.gateway.payment_statuses[payment_id] = payment_status
+            orders.append(
+                self.create_order(nowpayments_payment_id=payment_id, **fields)
+            )
+        return orders
+
+    def reconcile(self, batch_size=200):
+        return reconcile_pending_orders(
+            self.provider,
+            expire_after=timedelta(days=1),
+            min_age=timedelta(minutes=10),
+            batch_size=batch_size,
+            concurrency=2,
+        )
+
+    def assertStatus(self, order, status):
+        order.refresh_from_db()
+        self.assertEqual(order.status, status)
+
+
+class ReconcilePendingOrdersTests(ReconcileTestCase):
+    def test_settles_orders_by_payment_status(self):
+        paid, failed, expired, waiting = self.create_orders(
+            ["finished", "failed", "expired", "waiting"]
+        )
+        (recent,) = self.create_orders(["waiting"], age=timedelta(hours=1))
+        (new,) = self.create_orders(["finished"], age=timedelta())
+        unknown = self.create_order()
+
+        result = self.reconcile()
+
+        self.assertStatus(paid, Order.OrderStatus.PAID)
+        self.assertIsNotNone(paid.paid_at)
+        self.assertStatus(failed, Order.OrderStatus.FAILED)
+        self.assertStatus(expired, Order.OrderStatus.EXPIRED)
+        # Still waiting, or never seen by the gateway, past expire_after.
+        self.assertStatus(waiting, Order.OrderStatus.EXPIRED)
+        self.assertStatus(unknown, Order.OrderStatus.EXPIRED)
+        # Too recent to expire, or to check at all.
+        self.assertStatus(recent, Order.OrderStatus.PENDING)
+        self.assertStatus(new, Order.OrderStatus.PENDING)
+        self.assertEqual(result.checked, 6)
+        self.assertEqual(result.lookups, 5)
+        self.assertEqual(
+            result.changed,
+            {
+                Order.OrderStatus.PAID: 1,
+                Order.OrderStatus.FAILED: 1,
+                Order.OrderStatus.EXPIRED: 3,
+            },
+        )
+        self.assertEqual(
+            set(OrderTransition.objects.values_list("source", flat=True)),
+            {"reconcile"},
+        )
+
+    def test_lookup_errors_leave_orders_pending(self):
+        orders = self.create_orders(["finished", "waiting"])
+        unknown = self.create_order()
+        self.gateway.failure_rate = 1
+
+        with mock.patch("urllib3.util.Retry.sleep"), self.assertLogs(
+            "payments.reconciliation", "WARNING"
+        ):
+            result = self.reconcile()
+
+        for order in orders:
+            self.assertStatus(order, Order.OrderStatus.PENDING)
+        self.assertStatus(unknown, Order.OrderStatus.EXPIRED)
+        self.assertEqual(result.lookup_errors, 2)
+
+    def test_rerun_changes_nothing(self):
+        self.create_orders(["finished", "failed", "waiting"])
+        (recent,) = self.create_orders(["waiting"], age=timedelta(hours=1))
+        self.reconcile()
+        transitions = OrderTransition.objects.count()
+
+        result = self.reconcile()
+
+        self.assertEqual(result.changed, {})
+        self.assertEqual(result.checked, 1)
+        self.assertEqual(OrderTransition.objects.count(), transitions)
+        self.assertStatus(recent, Order.OrderStatus.PENDING)
+
+    def test_queries_per_batch_do_not_grow_with_batch_size(self):
+        self.create_orders(["finished", "failed", "waiting"] * 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.reconcile(batch_size=3)
+        self.assertFalse(
+            Order.objects.filter(status=Order.OrderStatus.PENDING).exists()
+        )
+
+        # Twice the orders in twice the batch size: the same two batches.
+        self.create_orders(["finished", "failed", "waiting"] * 4)
+        self.assertNumQueries(len(queries), lambda: self.reconcile(batch_size=6))
+
+
+
+class ReconcileInProgressPaymentsTests(ReconcileTestCase):
+    # As with ``payment_stub_gateway --payment-status confirming``.
+    gateway_options = {"payment_status": "confirming"}
+
+    def test_payments_in_progress_keep_orders_pending(self):
+        order = self.create_order(nowpayments_payment_id="1")
+        unknown = self.create_order()
+
+        result = self.reconcile()
+
+        self.assertStatus(order, Order.OrderStatus.PENDING)
+        self.assertStatus(unknown, Order.OrderStatus.EXPIRED)
+        self.assertEqual(result.changed, {Order.OrderStatus.EXPIRED: 1})
+
+
+class OrderExportTests(OrderTestCase):
+    def create_order(self, created_at, **fields):
+        order = super().create_order(**fields)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.refresh_from_db()
+        return order
+
+    def order_ids(self, **filters):
+        return [row[0] for row in get_export_rows(**filters)]
+
+    def test_filters_by_date_range_and_status(self):
+        day = datetime.date(2025, 3, 10)
+        midnight = timezone.make_aware(datetime.datetime(2025, 3, 10))
+        before = self.create_order(midnight - timedelta(microseconds=1))
+        first = self.create_order(midnight)
+        last = self.create_order(
+            midnight + timedelta(days=1, microseconds=-1),
+            status=Order.OrderStatus.PAID,
+        )
+        after = self.create_order(midnight + timedelta(days=1))
+
+        self.assertEqual(
+            self.order_ids(),
+            [before.order_id, first.order_id, last.order_id, after.order_id],
+        )
+        self.assertEqual(
+            self.order_ids(start=day, end=day), [first.order_id, last.order_id]
+        )
+        self.assertEqual(
+            self.order_ids(start=day), [first.order_id, last.order_id, after.order_id]
+        )
+        self.assertEqual(self.order_ids(end=day - timedelta(days=1)), [before.order_id])
+        self.assertEqual(
+            self.order_ids(start=day, status=Order.OrderStatus.PAID), [last.order_id]
+        )
+
+    def test_csv(self):
+        created_at = timezone.make_aware(datetime.datetime(2025, 3, 10, 9, 30))
+        order = self.create_order(created_at)
+
+        lines = list(iter_csv(get_export_rows()))
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            list(csv.reader(lines)),
+            [
+                [heading for heading, lookup in EXPORT_COLUMNS],
+                [
+                    order.order_id,
+                    "2025-03-10 09:30:00",
+                    "App",
+                    "Basic",
+                    "100.00",
+                    "pending",
+                    "",
+                ],
+            ],
+        )
+
+    def test_xlsx(self):
+        created_at = timezone.make_aware(datetime.datetime(2025, 3, 10, 9, 30))
+        order = self.create_order(created_at)
+
+        with write_xlsx(get_export_rows()) as output:
+            workbook = load_workbook(output, read_only=True)
+            rows = list(workbook["Orders"].values)
+            workbook.close()
+
+        self.assertEqual(
+            rows,
+            [
+                tuple(heading for heading, lookup in EXPORT_COLUMNS),
+                (
+                    order.order_id,
+                    datetime.datetime(2025, 3, 10, 9, 30),
+                    "App",
+                    "Basic",
+                    100,
+                    "pending",
+                    # Empty trailing cells are not written.
+                ),
+            ],
+        )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "benchmark_order_export", "--create", "3", "--format", "xlsx", stdout=out
+        )
+
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertIn("XLSX: 3 rows", out.getvalue())
+
+
+class VerifyWebhookBodyTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = NowPaymentsProvider(api_key="", ipn_secret_key="ipn-secret")
+
+    def sign(self, message, secret="ipn-secret"):
+        return hmac.new(secret.encode(), message, hashlib.sha512).hexdigest()
+
+    def test_valid_signature_returns_payload(self):
+        body = b'{"payment_status": "finished", "order_id": "1", "pay_amount": 0.5}'
+        signature = self.sign(
+            b'{"order_id":"1","pay_amount":0.5,"payment_status":"finished"}'
+        )
+
+        payload = self.provider.verify_webhook_body(body, signature)
+
+        self.assertEqual(
+            payload, {"payment_status": "finished", "order_id": "1", "pay_amount": 0.5}
+        )
+        self.assertEqual(
+            self.provider.verify_webhook_body(body, signature.upper()), payload
+        )
+
+    def test_numbers_are_signed_as_sent(self):
+        body = b'{"outcome_amount": 1e-7, "actually_paid": 155.10}'
+        signature = self.sign(b'{"actually_paid":155.10,"outcome_amount":1e-7}')
+
+        payload = self.provider.verify_webhook_body(body, signature)
+
+        self.assertEqual(payload, {"outcome_amount": 1e-7, "actually_paid": 155.1})
+
+    def test_canonical_json_keeps_numbers_as_sent(self):
+        self.assertEqual(
+            canonical_json(b'{"b": 0.5, "a": [155.10, 1E5, 1e-07]}'),
+            b'{"a":[155.10,1E5,1e-07],"b":0.5}',
+        )
+
+    def test_canonical_json_matches_json_dumps_for_plain_values(self):
+        value = {"b": [1, True, None, "é\n"], "a": {"d": 2.5, "c": "x"}}
+        self.assertEqual(
+            canonical_json(json.dumps(value)),
+            json.dumps(value, separators=(",", ":"), sort_keys=True).encode(),
+        )
+
+    def test_rejected(self):
+        body = b'{"order_id": "1"}'
+        signature = self.sign(b'{"order_id":"1"}')
+        cases = {
+            "wrong secret": (body, self.sign(b'{"order_id":"1"}', secret="wrong")),
+            "unsigned": (body, ""),
+            "not a digest": (body, signature[:64]),
+            "oversized": (
+                b'{"order_id": "1", "padding": "%s"}'
+                % (b"x" * NOWPAYMENTS_IPN_MAX_BYTES),
+                signature,
+            ),
+        }
+        for case, (case_body, case_signature) in cases.items():
+            with self.subTest(case):
+                self.assertIsNone(
+                    self.provider.verify_webhook_body(case_body, case_signature)
+                )
+
+    def test_no_secret_key_rejects_everything(self):
+        provider = NowPaymentsProvider(api_key="", ipn_secret_key="")
+        body = b'{"order_id": "1"}'
+        self.assertIsNone(
+            provider.verify_webhook_body(body, self.sign(b'{"order_id":"1"}', ""))
+        )
+
+    def test_invalid_json_raises(self):
+        for body in (b"[1, 2]", b"{not json"):
+            with self.subTest(body), self.assertRaises(ValueError):
+                self.provider.verify_webhook_body(body, "0" * 128)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "benchmark_ipn_verification", "--number", "1", "--rounds", "1", stdout=out
+        )
+        self.assertIn("verify_webhook_body", out.getvalue())
@@ -8,6 +8,12 @@ urlpatterns = [
         views.nowpayments_webhook_view,
         name="nowpayments_webhook",
     ),
+    path("order/<uuid:order_id>/", views.order_status_view, name="order_status"),
+    path(
+        "order/<uuid:order_id>/status/",
+        views.order_status_json_view,
+        name="order_status_json",
+    ),
     path("success/", views.payment_success_view, name="payment_success"),
     path("failure/", views.payment_failure_view, name="payment_failure"),
 ]
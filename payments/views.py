@@ -1,23 +1,33 @@
-import json
-from django.http import HttpResponse, HttpRequest
-from django.shortcuts import render, get_object_or_404
+from django.http import HttpResponse, HttpRequest, JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
 
 from .models import Order, PaymentSettings
-from .providers import NowPaymentsProvider
+from .notifications import receive_notification
+from .providers import NOWPAYMENTS_IPN_MAX_BYTES, NowPaymentsProvider
 
 
 @csrf_exempt
 def nowpayments_webhook_view(request: HttpRequest) -> HttpResponse:
     """
     Receives Instant Payment Notifications (IPN) from NOWPayments.
+
+    The signature is checked against the raw body, which is parsed once, and
+    not at all if it is unsigned or too large. Verified notifications are
+    stored and applied to their order in the background (see
+    payments.notifications), so NOWPayments gets its 200 straight away.
     """
+    signature = request.headers.get("x-nowpayments-sig")
+    if not signature:
+        return HttpResponse("Invalid signature", status=403)
     try:
-        signature = request.headers.get("x-nowpayments-sig")
-        payload = json.loads(request.body)
-    except (json.JSONDecodeError, KeyError):
+        content_length = int(request.headers.get("content-length") or 0)
+    except ValueError:
         return HttpResponse("Invalid request", status=400)
+    # Turn away oversized bodies before reading them.
+    if content_length > NOWPAYMENTS_IPN_MAX_BYTES:
+        return HttpResponse("Request too large", status=413)
 
     # Verify the signature
     payment_settings = PaymentSettings.for_request(request)
@@ -25,40 +35,16 @@ def nowpayments_webhook_view(request: HttpRequest) -> HttpResponse:
         api_key="", ipn_secret_key=payment_settings.nowpayments_ipn_secret_key
     )
 
-    if not provider.verify_webhook_signature(payload, signature):
+    try:
+        payload = provider.verify_webhook_body(request.body, signature)
+    except ValueError:
+        return HttpResponse("Invalid request", status=400)
+    if payload is None:
         return HttpResponse("Invalid signature", status=403)
 
-    # Process the verified webhook
-    order_id = payload.get("order_id")
-    payment_status = payload.get("payment_status")
+    receive_notification(request.body, signature, payload)
 
-    try:
-        order = Order.objects.get(order_id=order_id)
-
-        if payment_status == "finished":
-            if order.status == Order.OrderStatus.PENDING:
-                order.status = Order.OrderStatus.PAID
-                order.nowpayments_payment_id = payload.get("payment_id")
-                order.paid_at = timezone.now()
-                order.save()
-                # TODO: Send "Payment Received" email to client and admin
-
-        elif payment_status in ["expired", "failed"]:
-            if order.status == Order.OrderStatus.PENDING:
-                order.status = (
-                    Order.OrderStatus.FAILED
-                    if payment_status == "failed"
-                    else Order.OrderStatus.EXPIRED
-                )
-                order.save()
-                # TODO: Send "Payment Failed" email
-
-    except Order.DoesNotExist:
-        # This can happen if NOWPayments sends a notification for an order not in our DB
-        # You might want to log this for investigation
-        pass
-
-    return HttpResponse("Webhook processed successfully", status=200)
+    return HttpResponse("Webhook received", status=200)
 
 
 def payment_success_view(request):
@@ -69,3 +55,32 @@ def payment_success_view(request):
 def payment_failure_view(request):
     # This is the page the user sees after a failed or cancelled payment
     return render(request, "payments/payment_failure.html")
+
+
+@never_cache
+def order_status_view(request, order_id):
+    """
+    Where the customer waits while the invoice is created in the background.
+
+    The page polls ``order_status_json_view`` and moves on to the invoice as
+    soon as it exists; see payments.tasks.create_invoice_task.
+    """
+    order = get_object_or_404(
+        Order.objects.select_related("product", "pricing_tier"), order_id=order_id
+    )
+    if order.status == Order.OrderStatus.PENDING and order.nowpayments_invoice_url:
+        return redirect(order.nowpayments_invoice_url)
+    return render(request, "payments/order_status.html", {"order": order})
+
+
+@never_cache
+def order_status_json_view(request, order_id):
+    order = get_object_or_404(
+        Order.objects.only("status", "nowpayments_invoice_url"), order_id=order_id
+    )
+    return JsonResponse(
+        {
+            "status": order.status,
+            "invoice_url": order.nowpayments_invoice_url,
+        }
+    )
@@ -81,6 +81,11 @@ class PortfolioPage(Page):
         ], heading=_("Project Links")),
     ]
 
+    # Filter specs rendered by portfolio_page.html, pre-generated on publish.
+    rendition_specs = {
+        "gallery_images": ("fill-1200x800", "fill-165x165"),
+    }
+
     class Meta:
         verbose_name = _("Portfolio Page")
 
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from products.models import ProductCard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized ProductCard rows from the live product pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of products to load and insert per batch.",
+        )
+        parser.add_argument(
+            "--if-empty",
+            action="store_true",
+            help="Only build the cards if there are none yet, e.g. on start-up "
+            "after the cards table was first created.",
+        )
+
+    def handle(self, *args, **options):
+        if options["if_empty"] and ProductCard.objects.exists():
+            self.stdout.write("Product cards already built.")
+            return
+        count = ProductCard.objects.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} product cards."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_alter_productimage_image_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('page', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='card', serialize=False, to='products.productpage')),
+                ('title', models.CharField(max_length=255)),
+                ('url', models.TextField(blank=True)),
+                ('project_date', models.DateField(blank=True, null=True)),
+                ('summary', models.CharField(blank=True, max_length=255)),
+                ('category_name', models.CharField(blank=True, max_length=255)),
+                ('category_slug', models.SlugField(blank=True, max_length=255)),
+                ('image_rendition_url', models.TextField(blank=True)),
+                ('preview_url', models.TextField(blank=True)),
+                ('image_url', models.URLField(blank=True, max_length=255)),
+                ('tech_badges', models.JSONField(blank=True, default=list)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productcategory')),
+                ('listing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='product_cards', to='products.productlistingpage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing', '-project_date', '-page'], name='products_card_listing_date')],
+            },
+        ),
+    ]
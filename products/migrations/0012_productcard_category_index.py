@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_productcard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productcard',
+            index=models.Index(fields=['listing', 'category_slug', '-project_date', '-page'], name='products_card_category_date'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_productcard_category_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='productcard',
+            name='image_rendition_url',
+        ),
+        migrations.RemoveField(
+            model_name='productcard',
+            name='preview_url',
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='image_picture',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='preview_picture',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:40
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_sort_date(apps, schema_editor):
+    ProductCard = apps.get_model("products", "ProductCard")
+    ProductCard.objects.update(
+        sort_date=Coalesce("project_date", models.Value(datetime.date(1000, 1, 1)))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_card_pictures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='sort_date',
+            field=models.DateField(default=datetime.date(1000, 1, 1)),
+        ),
+        migrations.RunPython(fill_sort_date, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='productcard',
+            name='products_card_listing_date',
+        ),
+        migrations.RemoveIndex(
+            model_name='productcard',
+            name='products_card_category_date',
+        ),
+        migrations.AddIndex(
+            model_name='productcard',
+            index=models.Index(fields=['listing', '-sort_date', '-page'], name='products_card_listing_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='productcard',
+            index=models.Index(fields=['listing', 'category_slug', '-sort_date', '-page'], name='products_card_category_sort'),
+        ),
+    ]
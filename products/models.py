@@ -1,10 +1,17 @@
 import uuid
 from django.conf import settings
-from django.db import models
+from django.core.cache.utils import make_template_fragment_key
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 
 from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
 
+from wagtail.contrib.routable_page.models import RoutablePageMixin, path
 from wagtail.models import Page, Orderable
 from wagtail.admin.panels import (
     FieldPanel,
@@ -17,7 +24,10 @@ from wagtail import blocks
 from wagtail.snippets.models import register_snippet
 from wagtail.images.blocks import ImageChooserBlock
 
+from base.images import RenditionPolicy, batch_renditions, get_picture
+from base.remote_images import get_remote_images
 from products.blocks import AccordionBlock
+from products.pagination import CARD_ORDERING, UNDATED, paginate_cards
 
 # ===================================================================
 # 1. CATEGORY SNIPPET (For organizing products)
@@ -64,6 +74,30 @@ class ProductImage(Orderable):
 
     panels = [FieldPanel("image"), FieldPanel("image_url")]
 
+    @property
+    def display_image(self):
+        """The uploaded image, or the local copy of ``image_url`` once fetched.
+
+        See ``base.remote_images``; ``with_remote_images`` resolves a whole
+        gallery in one go.
+        """
+        if self.image_id is not None:
+            return self.image
+        if not hasattr(self, "remote_image"):
+            with_remote_images([self])
+        return self.remote_image
+
+
+def with_remote_images(rows):
+    """Attach the local copies of the gallery rows' ``image_url`` targets."""
+    rows = [row for row in rows if row is not None]
+    remote = get_remote_images(
+        row.image_url for row in rows if row.image_id is None and row.image_url
+    )
+    for row in rows:
+        row.remote_image = remote.get(row.image_url)
+    return rows
+
 
 class ProductTechBadge(Orderable):
     """A repeatable tech stack badge."""
@@ -178,14 +212,103 @@ class ProductPage(Page, ClusterableModel):
         ),
     ]
 
+    # Responsive image slots: the listing card, the gallery slider and the
+    # lightbox preview, which is bounded rather than the original upload. The
+    # lightbox only takes a src/srcset, i.e. the last format, so every slot
+    # ends in JPEG for browsers without WebP.
+    card_image_policy = RenditionPolicy(
+        "fill",
+        1200,
+        800,
+        widths=(400, 800, 1200),
+        sizes="(min-width: 1200px) 400px, (min-width: 992px) 50vw, 100vw",
+    )
+    slider_image_policy = RenditionPolicy(
+        "fill", 800, 600, widths=(400, 800), sizes="(min-width: 992px) 50vw, 100vw"
+    )
+    preview_policy = RenditionPolicy(
+        "max", 1600, 1600, widths=(800, 1600), formats=("webp", "jpeg")
+    )
+
+    # Filter specs rendered by this page's templates and the listing cards,
+    # pre-generated on publish (see base.images.warm_page_renditions).
+    rendition_specs = {
+        "gallery_images": (
+            "fill-165x165",
+            *slider_image_policy.filter_specs,
+            *preview_policy.filter_specs,
+        ),
+        "card_image": card_image_policy.filter_specs,
+    }
+
+    # Name of the `{% cache %}` fragment in products/includes/pricing.html.
+    PRICING_FRAGMENT_NAME = "product_pricing"
+
+    def get_pricing_fragment_key(self, revision_id=None):
+        """Cache key of the rendered pricing section for a given revision."""
+        if revision_id is None:
+            revision_id = self.latest_revision_id
+        return make_template_fragment_key(
+            self.PRICING_FRAGMENT_NAME, [self.pk, revision_id]
+        )
+
+    def get_remote_image_urls(self):
+        """Linked gallery images to download on publish (see base.remote_images)."""
+        return [
+            row.image_url
+            for row in self.gallery_images.all()
+            if row.image_id is None and row.image_url
+        ]
+
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        context["gallery_images"] = with_remote_images(
+            self.gallery_images.select_related("image")
+        )
+        # Lazy: only evaluated when the pricing fragment is not cached.
+        context["pricing_tiers"] = self.pricing_tiers.prefetch_related("features")
+        return context
+
+    @property
+    def card_image(self):
+        """The first gallery image, shown on listing cards.
+
+        Uses the gallery prefetched by ``with_card_data()`` when present so
+        that building a batch of cards does not query once per product.
+        """
+        if hasattr(self, "prefetched_gallery_images"):
+            images = self.prefetched_gallery_images
+            return images[0] if images else None
+        return self.gallery_images.first()
+
+
+def with_card_data(products):
+    """Load everything a product card renders alongside a ProductPage queryset."""
+    return products.select_related("category").prefetch_related(
+        Prefetch(
+            "gallery_images",
+            queryset=ProductImage.objects.select_related("image"),
+            to_attr="prefetched_gallery_images",
+        ),
+        "tech_stack",
+    )
+
 
 # ===================================================================
 # 3. PRODUCT LISTING PAGE
 # ===================================================================
 
 
-class ProductListingPage(Page):
-    """Page to list all the products."""
+class ProductListingPage(RoutablePageMixin, Page):
+    """
+    Page to list all the products.
+
+    The grid is filtered by category on the server (``category/<slug>/``) and
+    paginated with a keyset cursor; ``cards/`` returns just the next batch of
+    cards for infinite scroll.
+    """
+
+    PRODUCTS_PER_PAGE = 12
 
     introduction = models.TextField(blank=True)
 
@@ -251,23 +374,226 @@ class ProductListingPage(Page):
 
     subpage_types = ["products.ProductPage"]
 
-    def get_products(self):
-        products = (
-            ProductPage.objects.live().descendant_of(self).order_by("-project_date")
-        )
-        return products
+    def get_product_cards(self, category=None):
+        """Return the denormalized card rows for this listing, newest first."""
+        cards = self.product_cards.all()
+        if category is not None:
+            cards = cards.filter(category_slug=category.slug)
+        return cards.order_by(*CARD_ORDERING)
 
     def get_categories(self):
         categories = ProductCategory.objects.all()
         return categories
 
-    def get_context(self, request):
-        context = super().get_context(request)
-        # Get all published ProductPages that are children of this page
-        products = (
-            ProductPage.objects.live().descendant_of(self).order_by("-project_date")
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        context["categories"] = self.get_categories()
+        return context
+
+    def get_card_page(self, request, category=None):
+        """Context for one page of cards, starting after ``?after=<cursor>``."""
+        products, next_cursor = paginate_cards(
+            self.get_product_cards(category),
+            after=request.GET.get("after"),
+            per_page=self.PRODUCTS_PER_PAGE,
         )
-        categories = ProductCategory.objects.all()
-        context["products"] = products
-        context["categories"] = categories
+        context = {
+            "products": products,
+            "active_category": category,
+            "next_url": None,
+            "next_fragment_url": None,
+        }
+        if next_cursor:
+            if category is None:
+                listing_route, cards_route, kwargs = "index", "cards", None
+            else:
+                listing_route, cards_route = "category", "category_cards"
+                kwargs = {"category_slug": category.slug}
+            base_url = self.get_url(request)
+            query = f"?after={next_cursor}"
+            context["next_url"] = (
+                base_url + self.reverse_subpage(listing_route, kwargs=kwargs) + query
+            )
+            context["next_fragment_url"] = (
+                base_url + self.reverse_subpage(cards_route, kwargs=kwargs) + query
+            )
         return context
+
+    def get_section_cards(self):
+        """
+        The first page of cards for the home page's products section, and
+        whether the listing has more.
+        """
+        products, next_cursor = paginate_cards(
+            self.get_product_cards(), per_page=self.PRODUCTS_PER_PAGE
+        )
+        return {"products": products, "has_more": next_cursor is not None}
+
+    def _get_category(self, category_slug):
+        if category_slug is None:
+            return None
+        return get_object_or_404(ProductCategory, slug=category_slug)
+
+    @path("", name="index")
+    @path("category/<slug:category_slug>/", name="category")
+    def listing_view(self, request, category_slug=None):
+        category = self._get_category(category_slug)
+        return self.render(
+            request, context_overrides=self.get_card_page(request, category)
+        )
+
+    @path("cards/", name="cards")
+    @path("category/<slug:category_slug>/cards/", name="category_cards")
+    def cards_view(self, request, category_slug=None):
+        """Render only the next batch of cards, for infinite scroll."""
+        category = self._get_category(category_slug)
+        return TemplateResponse(
+            request,
+            "products/includes/product_cards.html",
+            self.get_card_page(request, category),
+        )
+
+
+# ===================================================================
+# 4. PRODUCT CARD PROJECTION (read model for the listing grids)
+# ===================================================================
+
+
+class ProductCardManager(models.Manager):
+    def refresh_for(self, page):
+        """Create or update the card for a live product, or drop it if not live."""
+        if not page.live:
+            self.filter(page_id=page.pk).delete()
+            return None
+        card = ProductCard.from_page(page)
+        card.save()
+        return card
+
+    def rebuild(self, batch_size=500):
+        """Replace every card with a fresh projection of the live products."""
+        products = with_card_data(ProductPage.objects.live()).order_by("path")
+        # Deepest listing first, so nested listings win over their ancestors.
+        listings = list(ProductListingPage.objects.order_by("-depth"))
+
+        def build_cards(pages):
+            batch_renditions(
+                with_remote_images(page.card_image for page in pages),
+                *ProductPage.card_image_policy.filter_specs,
+                *ProductPage.preview_policy.filter_specs,
+            )
+            cards = []
+            for page in pages:
+                listing = next(
+                    (each for each in listings if page.path.startswith(each.path)), None
+                )
+                cards.append(ProductCard.from_page(page, listing=listing))
+            return self.bulk_create(cards)
+
+        count = 0
+        with transaction.atomic():
+            self.all().delete()
+            pages = []
+            for page in products.iterator(chunk_size=batch_size):
+                pages.append(page)
+                if len(pages) >= batch_size:
+                    count += len(build_cards(pages))
+                    pages = []
+            count += len(build_cards(pages))
+        return count
+
+
+class ProductCard(models.Model):
+    """
+    One row per live ProductPage holding exactly what a listing card renders.
+
+    Rows are maintained by the signal handlers in `products.signals` and can be
+    rebuilt from scratch with `manage.py rebuild_product_cards`, so the product
+    grids never touch the page tree, gallery or badge tables. A card is saved
+    on publish with whatever renditions exist; its pictures are filled in once
+    the page's renditions are warmed (see `base.images.renditions_warmed`).
+    """
+
+    page = models.OneToOneField(
+        ProductPage,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name="card",
+    )
+    listing = models.ForeignKey(
+        ProductListingPage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="product_cards",
+    )
+    category = models.ForeignKey(
+        ProductCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    title = models.CharField(max_length=255)
+    url = models.TextField(blank=True)
+    project_date = models.DateField(null=True, blank=True)
+    # `project_date`, or `UNDATED`; the non-null key the grids sort and seek on.
+    sort_date = models.DateField(default=UNDATED)
+    summary = models.CharField(max_length=255, blank=True)
+    category_name = models.CharField(max_length=255, blank=True)
+    category_slug = models.SlugField(max_length=255, blank=True)
+    # `RenditionPolicy.picture` dicts for ProductPage's card and preview policies.
+    image_picture = models.JSONField(null=True, blank=True)
+    preview_picture = models.JSONField(null=True, blank=True)
+    image_url = models.URLField(max_length=255, blank=True)
+    tech_badges = models.JSONField(default=list, blank=True)
+
+    objects = ProductCardManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["listing", "-sort_date", "-page"],
+                name="products_card_listing_sort",
+            ),
+            models.Index(
+                fields=["listing", "category_slug", "-sort_date", "-page"],
+                name="products_card_category_sort",
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_page(cls, page, listing=None):
+        """Build an unsaved card from a (possibly prefetched) ProductPage."""
+        if listing is None:
+            listing = ProductListingPage.objects.ancestor_of(page).last()
+        card = cls(
+            page_id=page.pk,
+            listing=listing,
+            category=page.category,
+            title=page.title,
+            url=page.url or "",
+            project_date=page.project_date,
+            sort_date=page.project_date or UNDATED,
+            summary=Truncator(strip_tags(page.lead_paragraph or "")).chars(120),
+            category_name=page.category.name if page.category else "",
+            category_slug=page.category.slug if page.category else "",
+            tech_badges=[badge.name for badge in page.tech_stack.all()],
+        )
+        cover = page.card_image
+        if cover is not None:
+            card.image_url = cover.image_url or ""
+            image = cover.display_image
+            # Only renditions that exist: generating them is left to the
+            # rendition warming, which refreshes the card when done.
+            card.image_picture = get_picture(
+                image, page.card_image_policy, create=False
+            )
+            card.preview_picture = get_picture(
+                image, page.preview_policy, create=False
+            )
+        return card
@@ -0,0 +1,63 @@
+"""
+Keyset pagination for the product grids.
+
+Cards are ordered newest first on ``(sort_date, page_id)``. ``sort_date`` is
+the project date, or ``UNDATED`` for undated products so they sort last without
+a ``NULLS LAST`` clause (which MySQL can only emulate with an ``IS NULL`` sort
+key that skips the index). A cursor names the last card already shown, so
+fetching the next page is an indexed range scan no matter how deep the visitor
+has scrolled.
+"""
+
+import datetime
+
+from django.db.models import Q
+
+
+# Stands in for a missing project date; the earliest date every backend stores.
+UNDATED = datetime.date(1000, 1, 1)
+
+CARD_ORDERING = ("-sort_date", "-page_id")
+
+
+def encode_cursor(card):
+    """Return the opaque `after` value pointing just past ``card``."""
+    return f"{card.sort_date.isoformat()}_{card.page_id}"
+
+
+def decode_cursor(value):
+    """Parse an `after` value into ``(sort_date, page_id)``, or None if invalid."""
+    if not value:
+        return None
+    date, _, page_id = value.rpartition("_")
+    try:
+        return datetime.date.fromisoformat(date), int(page_id)
+    except ValueError:
+        return None
+
+
+def cards_after(cards, cursor):
+    """Restrict an ordered card queryset to the cards that follow ``cursor``."""
+    date, page_id = cursor
+    # The first condition bounds the index range; the second drops the cards
+    # already shown from the cursor's own date.
+    return cards.filter(sort_date__lte=date).filter(
+        Q(sort_date__lt=date) | Q(page_id__lt=page_id)
+    )
+
+
+def paginate_cards(cards, after=None, per_page=12):
+    """
+    Return ``(page_of_cards, next_cursor)`` for an ordered card queryset.
+
+    One extra row is fetched to tell whether another page exists; an invalid
+    cursor falls back to the first page.
+    """
+    cursor = decode_cursor(after)
+    if cursor is not None:
+        cards = cards_after(cards, cursor)
+    page = list(cards[: per_page + 1])
+    if len(page) > per_page:
+        page = page[:per_page]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from wagtail.signals import (
+    page_published,
+    page_slug_changed,
+    page_unpublished,
+    post_page_move,
+)
+
+from base.images import renditions_warmed
+from base.remote_images import remote_image_fetched
+from base.tasks import runs_in_background, warm_page_renditions_task
+from products.models import ProductCard, ProductCategory, ProductPage
+
+
+@receiver(page_published, sender=ProductPage)
+def refresh_product_card(sender, instance, **kwargs):
+    ProductCard.objects.refresh_for(instance)
+
+
+@receiver(renditions_warmed, sender=ProductPage)
+def refresh_product_card_pictures(sender, page, **kwargs):
+    ProductCard.objects.refresh_for(page)
+
+
+@receiver(page_unpublished, sender=ProductPage)
+def remove_unpublished_product_card(sender, instance, **kwargs):
+    ProductCard.objects.filter(page_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=ProductPage)
+def remove_deleted_product_card(sender, instance, **kwargs):
+    ProductCard.objects.filter(page_id=instance.pk).delete()
+
+
+def refresh_descendant_product_cards(page):
+    for product in ProductPage.objects.live().descendant_of(page, inclusive=True):
+        ProductCard.objects.refresh_for(product)
+
+
+@receiver(post_page_move)
+def refresh_moved_product_cards(sender, instance, **kwargs):
+    """A move changes the URL (and maybe the listing) of every product below it."""
+    refresh_descendant_product_cards(instance)
+
+
+@receiver(page_slug_changed)
+def refresh_renamed_product_cards(sender, instance, **kwargs):
+    """A new slug changes the URL of every product below the page."""
+    refresh_descendant_product_cards(instance)
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_product_card_category(sender, instance, **kwargs):
+    ProductCard.objects.filter(category=instance).update(
+        category_name=instance.name, category_slug=instance.slug
+    )
+
+
+@receiver(pre_delete, sender=ProductCategory)
+def clear_product_card_category(sender, instance, **kwargs):
+    ProductCard.objects.filter(category=instance).update(
+        category_name="", category_slug=""
+    )
+
+
+@receiver(page_published, sender=ProductPage)
+def clear_pricing_fragment(sender, instance, revision=None, **kwargs):
+    """Drop the cached pricing section so the published tiers render next hit."""
+    keys = {instance.get_pricing_fragment_key()}
+    if revision is not None:
+        keys.add(instance.get_pricing_fragment_key(revision.pk))
+    cache.delete_many(keys)
+
+
+@receiver(remote_image_fetched)
+def refresh_product_cards_for_remote_image(sender, remote_image, **kwargs):
+    """
+    Cards of products linking the image switch from the URL to the local copy
+    once its renditions are warmed (see `refresh_product_card_pictures`).
+    """
+    if not runs_in_background(warm_page_renditions_task):
+        return
+    products = ProductPage.objects.live().filter(
+        gallery_images__image_url=remote_image.url
+    )
+    for page_id in products.values_list("pk", flat=True).distinct():
+        warm_page_renditions_task.enqueue(page_id)
@@ -1,3 +1,182 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from wagtail.images.models import Image, Rendition
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from base.images import warm_page_renditions
+from products.models import (
+    ProductCard,
+    ProductCategory,
+    ProductImage,
+    ProductListingPage,
+    ProductPage,
+    ProductTechBadge,
+    with_card_data,
+)
+from products.pagination import paginate_cards
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, STORAGES=TEST_STORAGES)
+class ProductListingTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.listing = root.add_child(
+            instance=ProductListingPage(title="Products", slug="products")
+        )
+        cls.category = ProductCategory.objects.create(name="Web", slug="web")
+        cls.image = Image.objects.create(title="Cover", file=get_test_image_file())
+
+    def setUp(self):
+        cache.clear()
+
+    def add_products(self, count, project_date=datetime.date(2024, 1, 1)):
+        start = ProductPage.objects.count()
+        for number in range(start, start + count):
+            page = ProductPage(
+                title=f"Product {number}",
+                slug=f"product-{number}",
+                category=self.category,
+                project_date=project_date,
+                lead_paragraph="A product.",
+            )
+            page.gallery_images = [ProductImage(image=self.image)]
+            page.tech_stack = [ProductTechBadge(name="Django")]
+            self.listing.add_child(instance=page)
+            page.save_revision().publish()
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return len(queries)
+
+
+class ListingQueryCountTests(ProductListingTestCase):
+    def render_cards(self):
+        for page in with_card_data(ProductPage.objects.live()):
+            page.category.name
+            page.card_image.image.file
+            [badge.name for badge in page.tech_stack.all()]
+
+    def get_listing(self):
+        cache.clear()
+        response = self.client.get(self.listing.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_card_data_queries_do_not_grow_with_products(self):
+        self.add_products(3)
+        queries = self.count_queries(self.render_cards)
+        self.add_products(3)
+        self.assertNumQueries(queries, self.render_cards)
+
+    def test_listing_queries_do_not_grow_with_products(self):
+        self.add_products(3)
+        # The first request creates the site's settings rows.
+        self.get_listing()
+        queries = self.count_queries(self.get_listing)
+        self.add_products(3)
+        self.assertNumQueries(queries, self.get_listing)
+
+
+class CardPaginationTests(ProductListingTestCase):
+    def test_pages_cover_every_card_once_with_undated_last(self):
+        self.add_products(3, project_date=datetime.date(2024, 1, 1))
+        self.add_products(2, project_date=None)
+        self.add_products(2, project_date=datetime.date(2025, 1, 1))
+
+        seen, after = [], None
+        while True:
+            cards, after = paginate_cards(
+                self.listing.get_product_cards(), after=after, per_page=2
+            )
+            seen.extend(cards)
+            if after is None:
+                break
+
+        self.assertEqual(
+            [card.page_id for card in seen],
+            [card.page_id for card in self.listing.get_product_cards()],
+        )
+        self.assertEqual(len(seen), 7)
+        self.assertEqual([card.project_date for card in seen[-2:]], [None, None])
+        self.assertEqual(seen[0].project_date, datetime.date(2025, 1, 1))
+
+    def test_invalid_cursor_returns_first_page(self):
+        self.add_products(3)
+        cards, _ = paginate_cards(
+            self.listing.get_product_cards(), after="_12", per_page=2
+        )
+        self.assertEqual(cards, list(self.listing.get_product_cards()[:2]))
+
+    @mock.patch.object(ProductListingPage, "PRODUCTS_PER_PAGE", 2)
+    def test_section_cards_are_capped_at_one_page(self):
+        self.add_products(2)
+        self.assertEqual(
+            self.listing.get_section_cards(),
+            {"products": list(self.listing.get_product_cards()), "has_more": False},
+        )
+        self.add_products(1)
+        section = self.listing.get_section_cards()
+        self.assertEqual(len(section["products"]), 2)
+        self.assertTrue(section["has_more"])
+
+
+class ProductCardRefreshTests(ProductListingTestCase):
+    def test_renaming_an_ancestor_updates_card_urls(self):
+        self.add_products(2)
+        self.listing.slug = "catalogue"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.save_revision().publish()
+
+        urls = list(ProductCard.objects.values_list("url", flat=True))
+        self.assertEqual(len(urls), 2)
+        for url in urls:
+            self.assertTrue(url.startswith("/catalogue/"), url)
+
+    def test_publish_leaves_card_pictures_to_rendition_warming(self):
+        self.add_products(1)
+        card = ProductCard.objects.get()
+        self.assertIsNone(card.image_picture)
+        self.assertFalse(Rendition.objects.exists())
+
+        warm_page_renditions(ProductPage.objects.get())
+
+        card.refresh_from_db()
+        self.assertIsNotNone(card.image_picture)
+        self.assertIsNotNone(card.preview_picture)
+
+    def test_rebuild_if_empty_backfills_missing_cards(self):
+        self.add_products(2)
+        ProductCard.objects.all().delete()
+
+        call_command("rebuild_product_cards", "--if-empty", stdout=StringIO())
+        self.assertEqual(ProductCard.objects.count(), 2)
+
+        ProductCard.objects.filter(page_id=ProductPage.objects.first().pk).delete()
+        call_command("rebuild_product_cards", "--if-empty", stdout=StringIO())
+        self.assertEqual(ProductCard.objects.count(), 1)
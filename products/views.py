@@ -1,14 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib import messages
 
-from wagtail.models import Site
+from base.sites import get_site_for_request
 
 from .models import ProductPage, PricingTier
 from .forms import OrderForm
 
-# Import the payment provider and settings from the payments app
-from payments.models import Order, PaymentSettings
-from payments.providers import NowPaymentsProvider
+# Import the order model and invoice task from the payments app
+from payments.models import Order
+from payments.tasks import create_invoice_task
 
 
 def create_order_view(request, product_id, tier_id):
@@ -29,7 +28,6 @@ def create_order_view(request, product_id, tier_id):
                     product=product,
                     pricing_tier=tier,
                     price_at_purchase=tier.price,
-                    payment_provider='nowpayments', # Or your provider
                     
                     # Map the new form fields to the model fields
                     full_name=form.cleaned_data['full_name'],
@@ -40,24 +38,16 @@ def create_order_view(request, product_id, tier_id):
                     brand_details=form.cleaned_data['brand_details'],
             )
 
-            # Initiate payment with NOWPayments
-            payment_settings = PaymentSettings.for_request(request)
-            provider = NowPaymentsProvider(
-                api_key=payment_settings.nowpayments_api_key,
-                ipn_secret_key=payment_settings.nowpayments_ipn_secret_key,
+            # Create the NOWPayments invoice in the background and let the
+            # customer wait for it on the order status page. Without a matching
+            # site there are no payment settings; the task fails the order.
+            site = get_site_for_request(request)
+            create_invoice_task.enqueue(
+                order.pk,
+                site.pk if site is not None else None,
+                request.build_absolute_uri("/"),
             )
-
-            try:
-                redirect_url = provider.initiate_payment(order, request)
-                return redirect(redirect_url)
-            except Exception as e:
-                order.status = Order.OrderStatus.FAILED
-                order.save()
-                messages.error(
-                    request,
-                    "Could not connect to the payment gateway. Please try again.",
-                )
-                return redirect(product.get_url())
+            return redirect("payments:order_status", order_id=order.order_id)
     else:
         form = OrderForm()
 
@@ -9,6 +9,9 @@ from wagtail.blocks import (
 
 from wagtail.images.blocks import ImageChooserBlock
 
+from base.images import RenditionPolicy, get_picture
+from base.remote_images import get_remote_images
+
 # Service blocks
 
 class ImageBlock(ImageChooserBlock):
@@ -19,7 +22,22 @@ class ImageBlock(ImageChooserBlock):
         template = 'services/blocks/image_block.html'
 
 class ImageUrlBlock(StructBlock):
+    """An image linked by URL, served from its local copy once downloaded."""
+
     image_url = URLBlock()
+
+    image_policy = RenditionPolicy(
+        "max", 1200, 1200, widths=(600, 1200), sizes="(min-width: 992px) 66vw, 100vw"
+    )
+
+    def get_context(self, value, parent_context=None):
+        context = super().get_context(value, parent_context=parent_context)
+        url = value.get("image_url")
+        context["picture"] = get_picture(
+            get_remote_images([url]).get(url), self.image_policy
+        )
+        return context
+
     class Meta:
         icon = 'image'
         label = 'Full Width Image'
@@ -13,6 +13,7 @@ from modelcluster.fields import ParentalKey
 from wagtail.blocks import RichTextBlock
 
 from base.blocks import BaseStreamBlock
+from base.remote_images import get_remote_images
 from services.blocks import (
     ImageBlock,
     FeatureGridBlock,
@@ -86,6 +87,26 @@ class ServicePage(Page):
         PageChooserPanel("contact_form", "contact.ContactPage"),
     ]
 
+    # Filter specs rendered by the sidebar and the body's linked images,
+    # pre-generated on publish.
+    rendition_specs = {
+        "testimonial.author_image": ("fill-80x80",),
+        "linked_images": ImageUrlBlock.image_policy.filter_specs,
+    }
+
+    @property
+    def linked_images(self):
+        """The downloaded local copies of the body's linked images."""
+        return list(get_remote_images(self.get_remote_image_urls()).values())
+
+    def get_remote_image_urls(self):
+        """Linked body images to download on publish (see base.remote_images)."""
+        return [
+            block.value["image_url"]
+            for block in self.body
+            if block.block_type == "image_url"
+        ]
+
 
 class ServiceDetail(Orderable):
     """A single detail/fact for the service, editable inline on ServicePage."""
@@ -171,3 +192,8 @@ class WhyUsPage(Page):
         FieldPanel("secondary_cta_text"),
         FieldPanel("secondary_cta_link"),
     ]
+
+    # Filter specs rendered by includes/sections/why_us.html, pre-generated on publish.
+    rendition_specs = {
+        "showcase_image": ("fill-600x600",),
+    }
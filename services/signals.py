@@ -0,0 +1,15 @@
+from django.dispatch import receiver
+
+from base.remote_images import remote_image_fetched
+from base.tasks import runs_in_background, warm_page_renditions_task
+from services.models import ServicePage
+
+
+@receiver(remote_image_fetched)
+def warm_linked_image_renditions(sender, remote_image, **kwargs):
+    """Warm the pages linking an image that finished downloading after publish."""
+    if not runs_in_background(warm_page_renditions_task):
+        return
+    for page in ServicePage.objects.live().iterator():
+        if remote_image.url in page.get_remote_image_urls():
+            warm_page_renditions_task.enqueue(page.pk)
@@ -1,3 +1,56 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from base.images import warm_page_renditions
+from base.models import RemoteImage
+from services.blocks import ImageUrlBlock
+from services.models import ServicePage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ServicePageLinkedImageTests(TestCase):
+    url = "https://images.example.com/office.png"
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.page = root.add_child(
+            instance=ServicePage(
+                title="Design",
+                slug="design",
+                body=[("image_url", {"image_url": self.url})],
+            )
+        )
+        self.image = Image.objects.create(title="Office", file=get_test_image_file())
+
+    def test_pending_linked_images_are_skipped(self):
+        RemoteImage.objects.create(url=self.url)
+        self.assertEqual(self.page.linked_images, [])
+
+    def test_warms_linked_image_policy(self):
+        RemoteImage.objects.create(
+            url=self.url, image=self.image, status=RemoteImage.Status.FETCHED
+        )
+        self.assertEqual(self.page.linked_images, [self.image])
+
+        warm_page_renditions(self.page)
+
+        filter_specs = set(ImageUrlBlock.image_policy.filter_specs)
+        self.assertEqual(
+            set(self.image.renditions.values_list("filter_spec", flat=True)),
+            filter_specs,
+        )
@@ -86,6 +86,9 @@ MIDDLEWARE = [
 
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "base.cache.CacheVersionsMiddleware",
+    "base.sites.SiteMiddleware",
+    "base.page_cache.PageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -205,6 +208,9 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Output of the prerender_site command, one directory per site hostname.
+PRERENDER_ROOT = os.path.join(BASE_DIR, "prerendered")
+
 # Default storage settings
 # See https://docs.djangoproject.com/en/5.2/ref/settings/#std-setting-STORAGES
 STORAGES = {
@@ -221,6 +227,17 @@ STORAGES = {
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10_000
 
 
+# Background tasks
+# https://github.com/RealOrangeOne/django-tasks
+# Tasks run inline in development; production uses the database backend and
+# a `manage.py db_worker` process (see production.py).
+TASKS = {
+    "default": {
+        "BACKEND": "django_tasks.backends.immediate.ImmediateBackend",
+    }
+}
+
+
 # Wagtail settings
 
 WAGTAIL_SITE_NAME = "Sigmora"
@@ -87,10 +87,26 @@ if REDIS_URL:
     }
     DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
 else:
+    # Shared by every worker process, unlike the local-memory cache: the cache
+    # version counters (base.cache) and the page cache must be seen by all of
+    # them. Needs `manage.py createcachetable`.
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-            "LOCATION": "bakerydemo",
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "sigmora_cache",
+        }
+    }
+
+# Run background tasks (invoice creation, IPN processing, rendition warming)
+# in a separate `manage.py db_worker` process instead of inline in the
+# request, so a slow gateway never holds up a web worker. At least one
+# worker must be running (the Dockerfile starts one). TASKS_BACKEND=immediate
+# runs them inline instead.
+if os.environ.get("TASKS_BACKEND", "database").lower() == "database":
+    INSTALLED_APPS.append("django_tasks.backends.database")
+    TASKS = {
+        "default": {
+            "BACKEND": "django_tasks.backends.database.DatabaseBackend",
         }
     }
 
@@ -153,6 +169,13 @@ STORAGES["staticfiles"][
     "BACKEND"
 ] = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Serve a site's prerendered pages (see the prerender_site command) without
+# Django, e.g. PRERENDER_SITE_ROOT=/app/prerendered/www.example.com. WhiteNoise
+# indexes the files at startup, so reload the workers after prerendering.
+if "PRERENDER_SITE_ROOT" in os.environ:
+    WHITENOISE_ROOT = os.environ["PRERENDER_SITE_ROOT"]
+    WHITENOISE_INDEX_FILE = True
+
 
 if "AWS_STORAGE_BUCKET_NAME" in os.environ:
     AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME")
@@ -141,6 +141,78 @@
 
   });
 
+  /**
+   * Infinite scroll for server-paginated product grids
+   */
+  document.querySelectorAll('.product-cards').forEach(function(container) {
+    if (!('IntersectionObserver' in window)) return;
+
+    let observer = new IntersectionObserver(function(entries) {
+      entries.forEach(function(entry) {
+        if (!entry.isIntersecting) return;
+        let more = entry.target;
+        observer.unobserve(more);
+        fetch(more.getAttribute('data-next-fragment-url'), {
+          headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+          .then(function(response) {
+            if (!response.ok) throw new Error(response.statusText);
+            return response.text();
+          })
+          .then(function(html) {
+            more.insertAdjacentHTML('beforebegin', html);
+            more.remove();
+            let next = container.querySelector('.product-cards-more');
+            if (next) observer.observe(next);
+          })
+          .catch(function() {
+            // Leave the "Load more" link in place as a fallback.
+          });
+      });
+    }, { rootMargin: '400px' });
+
+    let more = container.querySelector('.product-cards-more');
+    if (more) observer.observe(more);
+  });
+
+  /**
+   * Wait on the order status page until the payment invoice is ready
+   */
+  document.querySelectorAll('.order-status[data-status-url]').forEach(function(status) {
+    let url = status.getAttribute('data-status-url');
+    let started = Date.now();
+
+    function poll() {
+      fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(function(response) {
+          if (!response.ok) throw new Error(response.statusText);
+          return response.json();
+        })
+        .then(function(order) {
+          if (order.status === 'pending' && order.invoice_url) {
+            window.location.assign(order.invoice_url);
+          } else if (order.status === 'pending') {
+            schedule();
+          } else {
+            // Failed, or settled elsewhere: let the server render the outcome.
+            window.location.reload();
+          }
+        })
+        .catch(schedule);
+    }
+
+    function schedule() {
+      let elapsed = Date.now() - started;
+      if (elapsed > 20000) {
+        status.querySelector('.order-status-slow').classList.remove('d-none');
+      }
+      // Poll quickly at first, then back off.
+      setTimeout(poll, elapsed < 10000 ? 1000 : 5000);
+    }
+
+    schedule();
+  });
+
   /**
    * Init swiper sliders
    */